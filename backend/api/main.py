@@ -1,10 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from contextlib import asynccontextmanager
-from app.database import connect_to_mongo, close_mongo_connection
+from app.database import connect_to_mongo, close_mongo_connection, get_database
 from app.routes import transactions, insights, goals
+from app.responses import FastJSONResponse
+from app.middleware import CompressionMiddleware, MetricsMiddleware
+from app.metrics import render_prometheus, PROMETHEUS_CONTENT_TYPE
+from app.services.import_jobs import import_queue
+from app.agents.llm_client import gemini_breaker
 import os
 from pathlib import Path
 
@@ -12,15 +17,18 @@ from pathlib import Path
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    await import_queue.start(get_database(), transactions.data_agent)
     yield
     # Shutdown
+    await import_queue.stop()
     await close_mongo_connection()
 
 app = FastAPI(
     title="FinWise AI API",
     description="AI-powered financial coaching for gig workers",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware - allow all origins since we're on same domain
@@ -32,6 +40,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses above COMPRESSION_MINIMUM_SIZE (brotli when available, else gzip)
+app.add_middleware(CompressionMiddleware)
+
+# Outermost, so recorded latency includes compression and CORS handling
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(transactions.router, prefix="/api/transactions", tags=["transactions"])
 app.include_router(insights.router, prefix="/api/insights", tags=["insights"])
@@ -47,4 +61,14 @@ async def root():
 
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy"}
+    # Still serving (with fallbacks) while the Gemini circuit is open
+    llm = gemini_breaker.snapshot()
+    return {
+        "status": "healthy" if llm["state"] == "closed" else "degraded",
+        "llm": llm
+    }
+
+@app.get("/api/metrics", include_in_schema=False)
+async def metrics():
+    """Request, MongoDB, LLM and cache metrics in Prometheus text format"""
+    return Response(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
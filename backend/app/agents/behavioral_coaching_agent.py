@@ -1,21 +1,13 @@
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
+from app.agents.llm_client import get_llm_client, extract_json
+from app.agents.prompts import coaching_prompt, parse_coaching_line
+from app.services.analytics_engine import compute_analysis, to_frame
 from datetime import datetime, timedelta
-import json
-
-load_dotenv()
 
 class BehavioralCoachingAgent:
     """Agent responsible for analyzing financial behavior and providing coaching"""
     
     def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
-        
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.llm = get_llm_client()
     
     async def analyze_and_coach(self, transactions: list, goals: list = None) -> dict:
         """
@@ -32,6 +24,21 @@ class BehavioralCoachingAgent:
         # Prepare transaction summary
         analysis = self._prepare_analysis(transactions)
         
+        return await self.coach(analysis, goals)
+    
+    async def coach(self, analysis: dict, goals: list = None) -> dict:
+        """
+        Generate coaching from an already computed analysis
+        
+        Args:
+            analysis: Summary as returned by _prepare_analysis or aggregate_analysis
+            goals: List of user goals
+        
+        Returns:
+            dict with insights, recommendations and analysis; "fallback" is True
+            when the model failed and the rule-based insights were used
+        """
+        
         # Generate AI insights
         ai_insights = await self._generate_insights(analysis, goals)
         
@@ -39,119 +46,20 @@ class BehavioralCoachingAgent:
             "insights": ai_insights.get("insights", []),
             "recommendations": ai_insights.get("recommendations", []),
             "income_analysis": analysis["income_analysis"],
-            "expense_analysis": analysis["expense_analysis"]
+            "expense_analysis": analysis["expense_analysis"],
+            "fallback": ai_insights.get("fallback", False)
         }
     
     def _prepare_analysis(self, transactions: list) -> dict:
         """Prepare structured analysis from transactions"""
-        
-        income_total = 0
-        expense_total = 0
-        income_by_category = {}
-        expense_by_category = {}
-        income_transactions = []
-        expense_transactions = []
-        
-        for txn in transactions:
-            amount = txn.get("amount", 0)
-            category = txn.get("category", "Uncategorized")
-            txn_type = txn.get("type")
-            
-            if txn_type == "income":
-                income_total += amount
-                income_by_category[category] = income_by_category.get(category, 0) + amount
-                income_transactions.append(txn)
-            else:
-                expense_total += amount
-                expense_by_category[category] = expense_by_category.get(category, 0) + amount
-                expense_transactions.append(txn)
-        
-        # Calculate income volatility (coefficient of variation)
-        if len(income_transactions) > 1:
-            income_amounts = [t.get("amount", 0) for t in income_transactions]
-            avg_income = sum(income_amounts) / len(income_amounts)
-            variance = sum((x - avg_income) ** 2 for x in income_amounts) / len(income_amounts)
-            std_dev = variance ** 0.5
-            volatility = (std_dev / avg_income * 100) if avg_income > 0 else 0
-        else:
-            volatility = 0
-        
-        return {
-            "income_analysis": {
-                "total": income_total,
-                "by_category": income_by_category,
-                "count": len(income_transactions),
-                "volatility": round(volatility, 2)
-            },
-            "expense_analysis": {
-                "total": expense_total,
-                "by_category": expense_by_category,
-                "count": len(expense_transactions),
-                "top_categories": sorted(
-                    expense_by_category.items(), 
-                    key=lambda x: x[1], 
-                    reverse=True
-                )[:3]
-            },
-            "net_savings": income_total - expense_total,
-            "savings_rate": ((income_total - expense_total) / income_total * 100) if income_total > 0 else 0
-        }
+        return compute_analysis(to_frame(transactions))
     
     async def _generate_insights(self, analysis: dict, goals: list = None) -> dict:
         """Generate AI-powered insights and recommendations"""
         
-        goal_info = ""
-        if goals and len(goals) > 0:
-            goal = goals[0]
-            goal_info = f"\nUser Goal: Save ₹{goal.get('target_amount', 0)} by {goal.get('target_date', 'N/A')}"
-        
-        prompt = f"""
-You are a financial coach specialized in helping gig workers and informal sector workers manage irregular income.
-
-Financial Summary:
-- Total Income: ₹{analysis['income_analysis']['total']:.2f}
-- Total Expenses: ₹{analysis['expense_analysis']['total']:.2f}
-- Net Savings: ₹{analysis['net_savings']:.2f}
-- Savings Rate: {analysis['savings_rate']:.1f}%
-- Income Volatility: {analysis['income_analysis']['volatility']:.1f}%
-- Number of Income Transactions: {analysis['income_analysis']['count']}
-- Number of Expense Transactions: {analysis['expense_analysis']['count']}
-
-Income by Category:
-{json.dumps(analysis['income_analysis']['by_category'], indent=2)}
-
-Top Expense Categories:
-{json.dumps(dict(analysis['expense_analysis']['top_categories']), indent=2)}
-{goal_info}
-
-Provide:
-1. 2-3 key insights about their financial behavior (be specific with numbers)
-2. 2-3 actionable recommendations tailored to gig workers with irregular income
-
-Respond with ONLY a JSON object in this format:
-{{
-    "insights": [
-        "Your income shows X% volatility, which is typical for gig work...",
-        "You're spending Y% of income on Z category..."
-    ],
-    "recommendations": [
-        "Build an emergency fund of ₹X to cover income gaps...",
-        "Consider setting aside 20% of each gig payment..."
-    ]
-}}
-"""
-        
         try:
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
-            
-            # Extract JSON from markdown code blocks if present
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
-            
-            result = json.loads(result_text)
+            result_text = await self.llm.generate(coaching_prompt(analysis, goals), name="coaching")
+            result = extract_json(result_text)
             
             return {
                 "insights": result.get("insights", []),
@@ -160,7 +68,40 @@ Respond with ONLY a JSON object in this format:
         
         except Exception as e:
             print(f"Error generating insights: {str(e)}")
-            return self._fallback_insights(analysis)
+            return {**self._fallback_insights(analysis), "fallback": True}
+    
+    async def stream_insights(self, analysis: dict, goals: list = None):
+        """
+        Yield ("insight" | "recommendation", text) pairs as the model writes them
+        
+        If the model fails before producing any item, the rule-based fallback
+        insights are yielded instead, preceded by a ("fallback", None) marker.
+        """
+        produced = 0
+        pending = ""
+        try:
+            async for chunk in self.llm.stream(coaching_prompt(analysis, goals, streaming=True), name="coaching_stream"):
+                pending += chunk
+                *lines, pending = pending.split("\n")
+                for line in lines:
+                    item = parse_coaching_line(line)
+                    if item is not None:
+                        produced += 1
+                        yield item
+            item = parse_coaching_line(pending)
+            if item is not None:
+                produced += 1
+                yield item
+        except Exception as e:
+            print(f"Error streaming insights: {str(e)}")
+        
+        if not produced:
+            fallback = self._fallback_insights(analysis)
+            yield "fallback", None
+            for text in fallback["insights"]:
+                yield "insight", text
+            for text in fallback["recommendations"]:
+                yield "recommendation", text
     
     def _fallback_insights(self, analysis: dict) -> dict:
         """Fallback insights if AI fails"""
@@ -0,0 +1,142 @@
+import os
+import time
+from collections import deque
+from typing import Optional
+from app.metrics import registry
+
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+LLM_BREAKER_FAILURE_RATE = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))
+LLM_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_CALL_SECONDS", "10"))
+LLM_BREAKER_SLOW_CALL_RATE = float(os.getenv("LLM_BREAKER_SLOW_CALL_RATE", "0.5"))
+LLM_BREAKER_OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+LLM_BREAKER_HALF_OPEN_PROBES = int(os.getenv("LLM_BREAKER_HALF_OPEN_PROBES", "1"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+# Gauge values for the state
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+breaker_state = registry.gauge("circuit_breaker_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)")
+breaker_transitions = registry.counter("circuit_breaker_transitions_total", "Circuit breaker state changes by target state")
+
+
+class CircuitBreakerOpenError(Exception):
+    """Raised instead of calling a dependency while its circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing or slow dependency so callers fall back at once
+
+    Outcomes of the last `window` calls are kept. Once at least `min_calls`
+    are recorded, the circuit opens when the failure rate or the share of
+    calls slower than `slow_call_seconds` reaches its threshold. After
+    `open_seconds` it turns half-open and lets `half_open_probes` calls
+    through: if they all succeed the circuit closes, any failure reopens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = LLM_BREAKER_WINDOW,
+        min_calls: int = LLM_BREAKER_MIN_CALLS,
+        failure_rate: float = LLM_BREAKER_FAILURE_RATE,
+        slow_call_seconds: float = LLM_BREAKER_SLOW_CALL_SECONDS,
+        slow_call_rate: float = LLM_BREAKER_SLOW_CALL_RATE,
+        open_seconds: float = LLM_BREAKER_OPEN_SECONDS,
+        half_open_probes: int = LLM_BREAKER_HALF_OPEN_PROBES,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        # (succeeded, slow) per call, newest last
+        self._outcomes = deque(maxlen=window)
+        self._opened_at: Optional[float] = None
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.state = CLOSED
+        breaker_state.set(STATE_VALUES[CLOSED], breaker=name)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        self.state = state
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._opened_at = None
+            self._outcomes.clear()
+        breaker_state.set(STATE_VALUES[state], breaker=self.name)
+        breaker_transitions.inc(breaker=self.name, state=state)
+        print(f"⚡ Circuit breaker {self.name}: {state}")
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now; every allowed call must be followed by record() or cancel()"""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                return False
+            self._probes_in_flight += 1
+        return True
+
+    def record(self, succeeded: bool, duration: float):
+        """Record the outcome of an allowed call"""
+        slow = duration >= self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if not succeeded or slow:
+                self._transition(OPEN)
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_probes:
+                self._transition(CLOSED)
+            return
+        if self.state == OPEN:
+            # A call that started before the circuit opened
+            return
+
+        self._outcomes.append((succeeded, slow))
+        if len(self._outcomes) < self.min_calls:
+            return
+        failure_rate, slow_rate = self._rates()
+        if failure_rate >= self.failure_rate or slow_rate >= self.slow_call_rate:
+            self._transition(OPEN)
+
+    def cancel(self):
+        """Release an allowed call that was abandoned without an outcome"""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _rates(self) -> tuple:
+        total = len(self._outcomes)
+        if not total:
+            return 0.0, 0.0
+        failures = sum(1 for succeeded, _ in self._outcomes if not succeeded)
+        slow = sum(1 for _, is_slow in self._outcomes if is_slow)
+        return failures / total, slow / total
+
+    def snapshot(self) -> dict:
+        """State summary for health checks"""
+        failure_rate, slow_rate = self._rates()
+        snapshot = {
+            "state": self.state,
+            "calls_in_window": len(self._outcomes),
+            "failure_rate": round(failure_rate, 3),
+            "slow_call_rate": round(slow_rate, 3),
+        }
+        if self.state == OPEN:
+            snapshot["retry_in_seconds"] = round(
+                max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1
+            )
+        return snapshot
@@ -1,93 +1,237 @@
-import google.generativeai as genai
+from app.agents.llm_client import get_llm_client, extract_json, LLM_TIMEOUT_SECONDS
+from app.agents.prompts import categorization_prompt, batch_categorization_prompt
+from app.agents.single_flight import SingleFlight
+from app.agents.local_categorizer import local_categorizer, DEFAULT_CATEGORY
+from app.services.category_cache import category_cache, cache_key
+from app.database import get_database
+from app.metrics import registry
+import asyncio
+import math
 import os
-from dotenv import load_dotenv
-import json
+from typing import Optional
 
-load_dotenv()
+# Bulk categorization tuning
+CATEGORIZATION_BATCH_SIZE = int(os.getenv("CATEGORIZATION_BATCH_SIZE", "25"))
+CATEGORIZATION_BATCH_CONCURRENCY = int(os.getenv("CATEGORIZATION_BATCH_CONCURRENCY", "4"))
+
+# How long a request waits on an identical categorization already in flight
+CATEGORIZATION_WAIT_TIMEOUT_SECONDS = float(
+    os.getenv("CATEGORIZATION_WAIT_TIMEOUT_SECONDS", str(LLM_TIMEOUT_SECONDS * 2))
+)
+# Amounts within the same half-decade (e.g. 100-316, 316-1000) share a prompt
+AMOUNT_BUCKETS_PER_DECADE = 2
+
+categorizations = registry.counter("categorizations_total", "Transactions categorized, by source (local/cache/llm/fallback)")
+
+def amount_bucket(amount: float) -> int:
+    """Coarse logarithmic bucket of an amount"""
+    return math.floor(math.log10(max(abs(amount), 1.0)) * AMOUNT_BUCKETS_PER_DECADE)
+
+def flight_key(description: str, transaction_type: str, amount: float) -> str:
+    """Key under which identical categorization prompts are coalesced"""
+    return f"{cache_key(description, transaction_type)}:{amount_bucket(amount)}"
 
 class DataAnalysisAgent:
     """Agent responsible for categorizing transactions using Gemini AI"""
     
     def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
-        
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.llm = get_llm_client()
+        # Concurrent requests for the same uncached description share one Gemini call
+        self.flights = SingleFlight("categorization", CATEGORIZATION_WAIT_TIMEOUT_SECONDS)
     
-    async def categorize_transaction(self, description: str, amount: float, transaction_type: str) -> dict:
+    async def categorize_transaction(
+        self,
+        description: str,
+        amount: float,
+        transaction_type: str,
+        user_id: Optional[str] = None
+    ) -> dict:
         """
-        Categorize a transaction using Gemini AI
+        Categorize a transaction locally when confident, otherwise via the cache or Gemini AI
         
         Returns:
             dict: {
                 "category": str,
-                "confidence_score": float (0-1)
+                "confidence_score": float (0-1),
+                "source": "local" | "cache" | "llm" | "fallback"
             }
         """
+        await local_categorizer.ensure_trained(get_database(), user_id)
+        local = local_categorizer.categorize(description, transaction_type, user_id)
+        if local is not None:
+            categorizations.inc(source="local")
+            return local
         
-        prompt = f"""
-You are a financial transaction categorization expert. Analyze this transaction and categorize it.
-
-Transaction Details:
-- Description: {description}
-- Amount: ₹{amount}
-- Type: {transaction_type}
-
-Categories for expenses: Food & Dining, Transportation, Bills & Utilities, Shopping, Entertainment, Healthcare, Education, Other Expense
-Categories for income: Freelance/Gig Income, Salary, Business Income, Investment Returns, Other Income
-
-Respond with ONLY a JSON object in this exact format:
-{{
-    "category": "category name",
-    "confidence_score": 0.95,
-    "reasoning": "brief explanation"
-}}
-"""
+        cached = await category_cache.get(description, transaction_type)
+        if cached is not None:
+            categorizations.inc(source="cache")
+            return cached
+        
+        async def categorize_and_cache():
+            categorization = await self._categorize_with_llm(description, amount, transaction_type)
+            if categorization["source"] == "llm":
+                await category_cache.set(description, transaction_type, categorization)
+            return categorization
         
         try:
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
-            
-            # Extract JSON from markdown code blocks if present
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
-            
-            result = json.loads(result_text)
+            categorization = dict(await self.flights.do(
+                flight_key(description, transaction_type, amount),
+                categorize_and_cache
+            ))
+        except Exception as e:
+            print(f"Error waiting for categorization: {str(e)}")
+            categorization = {**self._fallback_categorization(description, transaction_type), "source": "fallback"}
+        categorizations.inc(source=categorization["source"])
+        return categorization
+    
+    async def _categorize_with_llm(self, description: str, amount: float, transaction_type: str) -> dict:
+        """Categorize a single transaction with one Gemini prompt"""
+        try:
+            result_text = await self.llm.generate(
+                categorization_prompt(description, amount, transaction_type),
+                name="categorization"
+            )
+            result = extract_json(result_text)
             
             return {
                 "category": result.get("category", "Uncategorized"),
-                "confidence_score": result.get("confidence_score", 0.7)
+                "confidence_score": result.get("confidence_score", 0.7),
+                "source": "llm"
             }
         
         except Exception as e:
             print(f"Error in categorization: {str(e)}")
             # Fallback to simple rule-based categorization
-            return self._fallback_categorization(description, transaction_type)
+            return {**self._fallback_categorization(description, transaction_type), "source": "fallback"}
     
-    def _fallback_categorization(self, description: str, transaction_type: str) -> dict:
-        """Simple rule-based fallback categorization"""
-        description_lower = description.lower()
+    async def categorize_transactions(
+        self,
+        transactions: list,
+        batch_size: int = CATEGORIZATION_BATCH_SIZE,
+        max_concurrency: int = CATEGORIZATION_BATCH_CONCURRENCY,
+        user_id: Optional[str] = None
+    ) -> list:
+        """
+        Categorize many transactions with one Gemini prompt per batch
         
-        if transaction_type == "income":
-            if any(word in description_lower for word in ["freelance", "gig", "project", "client"]):
-                return {"category": "Freelance/Gig Income", "confidence_score": 0.6}
-            elif any(word in description_lower for word in ["salary", "wage"]):
-                return {"category": "Salary", "confidence_score": 0.6}
-            else:
-                return {"category": "Other Income", "confidence_score": 0.5}
+        Confident local matches and cached descriptions are answered without
+        a prompt, repeated descriptions are only sent to Gemini once, and
+        descriptions another request is already categorizing are awaited.
         
-        else:  # expense
-            if any(word in description_lower for word in ["food", "restaurant", "meal", "swiggy", "zomato"]):
-                return {"category": "Food & Dining", "confidence_score": 0.6}
-            elif any(word in description_lower for word in ["uber", "ola", "transport", "petrol", "fuel"]):
-                return {"category": "Transportation", "confidence_score": 0.6}
-            elif any(word in description_lower for word in ["electricity", "water", "rent", "bill"]):
-                return {"category": "Bills & Utilities", "confidence_score": 0.6}
-            elif any(word in description_lower for word in ["amazon", "flipkart", "shopping", "clothes"]):
-                return {"category": "Shopping", "confidence_score": 0.6}
+        Args:
+            transactions: List of dicts with description, amount and type
+            batch_size: Number of transactions packed into each prompt
+            max_concurrency: Number of batch prompts allowed in flight at once
+            user_id: Owner of the transactions, selects the local classifier
+                (keyword rules only when None)
+            
+        Returns:
+            list of categorization dicts, in the same order as the input
+        """
+        await local_categorizer.ensure_trained(get_database(), user_id)
+        results = [
+            local_categorizer.categorize(txn["description"], txn["type"], user_id)
+            for txn in transactions
+        ]
+        
+        unresolved = [i for i, result in enumerate(results) if result is None]
+        cached = await category_cache.get_many(
+            [(transactions[i]["description"], transactions[i]["type"]) for i in unresolved]
+        )
+        for i, result in zip(unresolved, cached):
+            results[i] = result
+        
+        # One representative transaction per uncached description
+        pending = {}
+        for txn, result in zip(transactions, results):
+            if result is None:
+                pending.setdefault(cache_key(txn["description"], txn["type"]), txn)
+        
+        # Descriptions already being categorized by a concurrent request are awaited, not re-sent
+        flights = {}
+        unique = []
+        for key, txn in pending.items():
+            flight = flight_key(txn["description"], txn["type"], txn["amount"])
+            future, leader = self.flights.claim(flight)
+            flights[key] = future
+            if leader:
+                unique.append((flight, txn, future))
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run_batch(start: int):
+            async with semaphore:
+                return await self._categorize_batch([txn for _, txn, _ in unique[start:start + batch_size]])
+        
+        try:
+            batches = await asyncio.gather(*[
+                run_batch(start) for start in range(0, len(unique), batch_size)
+            ])
+            categorized = [categorization for batch in batches for categorization in batch]
+            
+            await category_cache.set_many([
+                (txn["description"], txn["type"], categorization)
+                for (_, txn, _), categorization in zip(unique, categorized)
+                if categorization["source"] == "llm"
+            ])
+        except BaseException as e:
+            for flight, _, future in unique:
+                self.flights.resolve(flight, future, error=e)
+            raise
+        for (flight, _, future), categorization in zip(unique, categorized):
+            self.flights.resolve(flight, future, result=categorization)
+        
+        by_key = {}
+        for key, future in flights.items():
+            try:
+                by_key[key] = dict(await self.flights.wait(future))
+            except Exception as e:
+                print(f"Error waiting for categorization: {str(e)}")
+                txn = pending[key]
+                by_key[key] = {**self._fallback_categorization(txn["description"], txn["type"]), "source": "fallback"}
+        results = [
+            result if result is not None else by_key[cache_key(txn["description"], txn["type"])]
+            for txn, result in zip(transactions, results)
+        ]
+        for result in results:
+            categorizations.inc(source=result["source"])
+        return results
+    
+    async def _categorize_batch(self, transactions: list) -> list:
+        """Categorize one batch with a single multi-transaction prompt"""
+        results = {}
+        try:
+            result_text = await self.llm.generate(
+                batch_categorization_prompt(transactions),
+                name="batch_categorization"
+            )
+            parsed = extract_json(result_text)
+            for entry in parsed:
+                if isinstance(entry, dict) and entry.get("category"):
+                    results[entry.get("id")] = entry
+        except Exception as e:
+            print(f"Error in batch categorization: {str(e)}")
+        
+        categorizations = []
+        for i, txn in enumerate(transactions):
+            entry = results.get(i)
+            if entry is None:
+                # Missing or malformed entry: fall back for this row only
+                categorizations.append({
+                    **self._fallback_categorization(txn["description"], txn["type"]),
+                    "source": "fallback"
+                })
             else:
-                return {"category": "Other Expense", "confidence_score": 0.5}
+                categorizations.append({
+                    "category": entry["category"],
+                    "confidence_score": entry.get("confidence_score", 0.7),
+                    "source": "llm"
+                })
+        return categorizations
+    
+    def _fallback_categorization(self, description: str, transaction_type: str) -> dict:
+        """Simple rule-based fallback categorization"""
+        category = local_categorizer.matcher.best_match(description, transaction_type)
+        if category is not None:
+            return {"category": category, "confidence_score": 0.6}
+        return {"category": DEFAULT_CATEGORY.get(transaction_type, "Other Expense"), "confidence_score": 0.5}
@@ -0,0 +1,261 @@
+import google.generativeai as genai
+import asyncio
+import os
+import time
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from dotenv import load_dotenv
+from app.metrics import registry
+from app.agents.circuit_breaker import CircuitBreaker, CircuitBreakerOpenError
+
+load_dotenv()
+
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-pro")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+
+llm_queue_depth = registry.gauge("llm_queue_depth", "LLM calls waiting for a concurrency slot")
+llm_in_flight = registry.gauge("llm_in_flight", "LLM calls currently executing")
+llm_calls = registry.counter("llm_calls_total", "LLM calls by outcome")
+llm_latency = registry.histogram("llm_call_latency_seconds", "LLM call latency, excluding queue wait")
+llm_queue_wait = registry.histogram("llm_queue_wait_seconds", "Time spent waiting for a concurrency slot")
+llm_tokens = registry.counter("llm_tokens_total", "LLM tokens by kind (prompt/response) and prompt name")
+TOKEN_BUCKETS = (50, 100, 200, 400, 800, 1600, 3200, 6400)
+llm_prompt_tokens = registry.histogram("llm_prompt_tokens", "Prompt tokens per call by prompt name", buckets=TOKEN_BUCKETS)
+llm_response_tokens = registry.histogram("llm_response_tokens", "Response tokens per call by prompt name", buckets=TOKEN_BUCKETS)
+
+# Rough characters-per-token ratio used when the SDK reports no usage
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count for text the model did not report usage for"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def record_token_usage(response, prompt: str, text: str, name: str = "generic") -> tuple:
+    """
+    Count one call's prompt/response tokens, preferring the usage metadata the API returns
+
+    Returns:
+        (prompt_tokens, response_tokens)
+    """
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None) or estimate_tokens(prompt)
+    response_tokens = getattr(usage, "candidates_token_count", None) or estimate_tokens(text)
+    llm_tokens.inc(prompt_tokens, kind="prompt", prompt=name)
+    llm_tokens.inc(response_tokens, kind="response", prompt=name)
+    llm_prompt_tokens.observe(prompt_tokens, prompt=name)
+    llm_response_tokens.observe(response_tokens, prompt=name)
+    return prompt_tokens, response_tokens
+
+
+class LLMTimeoutError(Exception):
+    """Raised when a Gemini call exceeds its time budget"""
+
+
+# Shared by every LLMClient, so all agents stop calling Gemini together during an outage
+gemini_breaker = CircuitBreaker("gemini")
+
+
+class LLMClient:
+    """Async execution layer for Gemini calls shared by all agents
+
+    The google-generativeai SDK call is blocking, so it runs on a bounded
+    thread pool. A semaphore caps concurrent calls and every call carries
+    its own timeout, so a slow model never stalls the event loop. While the
+    circuit breaker is open, calls fail immediately with
+    CircuitBreakerOpenError and agents use their fallbacks.
+    """
+
+    def __init__(
+        self,
+        model_name: str = GEMINI_MODEL_NAME,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        breaker: CircuitBreaker = gemini_breaker,
+    ):
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment variables")
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.breaker = breaker
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix="gemini"
+        )
+
+    async def _acquire(self):
+        """Pass the circuit breaker and take a concurrency slot"""
+        if not self.breaker.allow():
+            llm_calls.inc(outcome="rejected")
+            raise CircuitBreakerOpenError(f"Gemini circuit is {self.breaker.state}; not calling the model")
+
+        llm_queue_depth.inc()
+        queued_at = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            self.breaker.cancel()
+            raise
+        finally:
+            llm_queue_depth.dec()
+        llm_queue_wait.observe(time.perf_counter() - queued_at)
+        llm_in_flight.inc()
+
+    def _release_slot(self, future: Optional[asyncio.Future] = None):
+        """Free a concurrency slot once its pool thread has actually returned"""
+        if future is not None and not future.cancelled():
+            # Marks an error nobody awaited (the caller timed out) as retrieved
+            future.exception()
+        llm_in_flight.dec()
+        self._semaphore.release()
+
+    def _run(self, func, *args) -> asyncio.Future:
+        """
+        Start func on the pool after _acquire(); the slot is held until the thread returns
+
+        A caller that times out stops waiting, but the blocking SDK call keeps
+        its thread. Keeping the slot until then means waiting callers queue on
+        the semaphore (visible in llm_queue_depth) rather than silently in the
+        executor, where their timeout would already be running.
+        """
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        except BaseException:
+            self._release_slot()
+            raise
+        future.add_done_callback(self._release_slot)
+        return future
+
+    def _record(self, outcome: str, started_at: float):
+        """Record a finished (or abandoned) call for the breaker and metrics"""
+        duration = time.perf_counter() - started_at
+        if outcome == "cancelled":
+            self.breaker.cancel()
+        else:
+            self.breaker.record(outcome == "ok", duration)
+        llm_latency.observe(duration)
+        llm_calls.inc(outcome=outcome)
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None, name: str = "generic") -> str:
+        """
+        Run a prompt through the model and return the response text
+        
+        Args:
+            name: Prompt name for the per-call token metrics (e.g. "coaching")
+        """
+        timeout = timeout or self.timeout
+
+        await self._acquire()
+        started_at = time.perf_counter()
+        outcome = "error"
+        try:
+            future = self._run(self.model.generate_content, prompt)
+            try:
+                # Shielded: a timeout must not mark the still-running call as done
+                response = await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise LLMTimeoutError(f"Gemini call timed out after {timeout:.1f}s")
+            text = response.text
+            record_token_usage(response, prompt, text, name)
+            outcome = "ok"
+            return text
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            self._record(outcome, started_at)
+
+    async def stream(self, prompt: str, timeout: Optional[float] = None, name: str = "generic"):
+        """
+        Run a prompt with a streaming response, yielding text chunks as the model produces them
+        
+        The SDK iterator blocks, so a pool thread drains it into a queue. The
+        timeout covers the whole response; closing the generator early stops
+        the thread at its next chunk.
+        """
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stopped = threading.Event()
+        finished = object()
+
+        def publish(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # Event loop already closed
+                stopped.set()
+
+        def produce():
+            try:
+                response = self.model.generate_content(prompt, stream=True)
+                for chunk in response:
+                    if stopped.is_set():
+                        return
+                    publish(chunk.text)
+                publish((finished, response))
+            except Exception as e:
+                publish(e)
+
+        await self._acquire()
+        started_at = time.perf_counter()
+        outcome = "error"
+        try:
+            self._run(produce)
+            deadline = loop.time() + timeout
+            parts = []
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    outcome = "timeout"
+                    raise LLMTimeoutError(f"Gemini stream timed out after {timeout:.1f}s")
+                if isinstance(item, Exception):
+                    raise item
+                if isinstance(item, tuple) and item[0] is finished:
+                    record_token_usage(item[1], prompt, "".join(parts), name)
+                    outcome = "ok"
+                    return
+                parts.append(item)
+                yield item
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = "cancelled"
+            raise
+        finally:
+            stopped.set()
+            self._record(outcome, started_at)
+
+    def shutdown(self):
+        """Stop the worker threads (pending calls are abandoned)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_json(result_text: str):
+    """Parse a JSON payload from a model response, unwrapping markdown code fences"""
+    result_text = result_text.strip()
+    if "```json" in result_text:
+        result_text = result_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in result_text:
+        result_text = result_text.split("```")[1].split("```")[0].strip()
+    return json.loads(result_text)
+
+
+_llm_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """Return the process-wide LLM client, creating it on first use"""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = LLMClient()
+    return _llm_client
@@ -0,0 +1,235 @@
+import math
+import os
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Optional
+
+LOCAL_CATEGORIZER_THRESHOLD = float(os.getenv("LOCAL_CATEGORIZER_THRESHOLD", "0.85"))
+LOCAL_CLASSIFIER_MIN_EXAMPLES = int(os.getenv("LOCAL_CLASSIFIER_MIN_EXAMPLES", "20"))
+LOCAL_CLASSIFIER_MAX_EXAMPLES = int(os.getenv("LOCAL_CLASSIFIER_MAX_EXAMPLES", "5000"))
+LOCAL_CLASSIFIER_REFRESH_SECONDS = float(os.getenv("LOCAL_CLASSIFIER_REFRESH_SECONDS", "600"))
+# Classifiers kept in memory; the least recently used user's is dropped (and retrained on return)
+LOCAL_CLASSIFIER_MAX_USERS = int(os.getenv("LOCAL_CLASSIFIER_MAX_USERS", "1000"))
+
+# Confidence given to an unambiguous keyword hit
+KEYWORD_CONFIDENCE = 0.9
+
+# Keyword rules per transaction type, in priority order
+KEYWORD_RULES = {
+    "income": [
+        ("Freelance/Gig Income", ["freelance", "freelancer", "freelancing", "gig", "project", "client", "driving", "rides", "payout"]),
+        ("Salary", ["salary", "salaries", "wage", "payroll"]),
+        ("Business Income", ["business", "sales", "shop income"]),
+        ("Investment Returns", ["dividend", "interest", "mutual fund", "stock"]),
+    ],
+    "expense": [
+        ("Food & Dining", ["food", "restaurant", "meal", "swiggy", "zomato", "cafe", "grocer", "grocery", "groceries"]),
+        ("Transportation", ["uber", "ola", "transport", "transportation", "petrol", "fuel", "metro", "bus", "parking", "toll"]),
+        ("Bills & Utilities", ["electricity", "water", "rent", "rental", "bill", "recharge", "internet", "wifi"]),
+        ("Shopping", ["amazon", "flipkart", "shopping", "clothes"]),
+        ("Entertainment", ["movie", "netflix", "spotify", "hotstar"]),
+        ("Healthcare", ["doctor", "hospital", "pharmacy", "pharmacies", "medicine", "clinic"]),
+        ("Education", ["course", "tuition", "school", "college", "books"]),
+    ],
+}
+
+DEFAULT_CATEGORY = {"income": "Other Income", "expense": "Other Expense"}
+
+_TOKEN = re.compile(r"[a-z]+")
+
+
+def tokenize(description: str) -> list:
+    return _TOKEN.findall(description.lower())
+
+
+class KeywordMatcher:
+    """Matches all keywords of a transaction type in one pass of a single compiled regex"""
+
+    def __init__(self, rules: dict = KEYWORD_RULES):
+        self._patterns = {}
+        self._categories = {}
+        self._priority = {}
+        for txn_type, categories in rules.items():
+            lookup = {}
+            for priority, (category, keywords) in enumerate(categories):
+                self._priority[(txn_type, category)] = priority
+                for keyword in keywords:
+                    lookup[keyword] = category
+            # Longest keywords first so multi-word phrases win over their prefixes; whole
+            # words only (plus a plural "s"/"es"), so "bill" does not match "billiards"
+            alternation = "|".join(re.escape(k) for k in sorted(lookup, key=len, reverse=True))
+            self._patterns[txn_type] = re.compile(rf"\b({alternation})(?:e?s)?\b")
+            self._categories[txn_type] = lookup
+
+    def match(self, description: str, transaction_type: str) -> Counter:
+        """Return keyword hit counts per category"""
+        pattern = self._patterns.get(transaction_type)
+        if pattern is None:
+            return Counter()
+        lookup = self._categories[transaction_type]
+        return Counter(lookup[hit] for hit in pattern.findall(description.lower()))
+
+    def best_match(self, description: str, transaction_type: str) -> Optional[str]:
+        """Highest-priority category with any keyword hit"""
+        hits = self.match(description, transaction_type)
+        if not hits:
+            return None
+        return min(hits, key=lambda category: self._priority[(transaction_type, category)])
+
+
+class NaiveBayesClassifier:
+    """Multinomial naive Bayes over description tokens, one model per transaction type"""
+
+    def __init__(self):
+        self._class_counts = {}
+        self._token_counts = {}
+        self._token_totals = {}
+        self._vocab = {}
+        self.example_count = 0
+
+    def fit(self, examples: list):
+        """Train from (description, type, category) triples"""
+        class_counts = {}
+        token_counts = {}
+        vocab = {}
+        for description, txn_type, category in examples:
+            class_counts.setdefault(txn_type, Counter())[category] += 1
+            counts = token_counts.setdefault(txn_type, {}).setdefault(category, Counter())
+            tokens = tokenize(description)
+            counts.update(tokens)
+            vocab.setdefault(txn_type, set()).update(tokens)
+
+        self._class_counts = class_counts
+        self._token_counts = token_counts
+        self._token_totals = {
+            txn_type: {category: sum(c.values()) for category, c in by_category.items()}
+            for txn_type, by_category in token_counts.items()
+        }
+        self._vocab = vocab
+        self.example_count = len(examples)
+        return self
+
+    def predict(self, description: str, transaction_type: str) -> Optional[tuple]:
+        """
+        Return (category, posterior probability), or None when the model has nothing to go on
+
+        That is no model for the type, fewer than two categories to choose between, or a
+        description whose words are mostly unseen. Smoothing favours the smaller category
+        for every unseen word, so such a posterior says nothing about the description.
+        """
+        class_counts = self._class_counts.get(transaction_type)
+        if not class_counts or len(class_counts) < 2:
+            return None
+        tokens = tokenize(description)
+        vocab = self._vocab[transaction_type]
+        known = sum(1 for token in tokens if token in vocab)
+        if not known or known * 2 < len(tokens):
+            return None
+
+        total = sum(class_counts.values())
+        vocab_size = len(vocab) + 1
+        log_scores = {}
+        for category, count in class_counts.items():
+            counts = self._token_counts[transaction_type][category]
+            denominator = self._token_totals[transaction_type][category] + vocab_size
+            score = math.log(count / total)
+            for token in tokens:
+                score += math.log((counts.get(token, 0) + 1) / denominator)
+            log_scores[category] = score
+
+        best = max(log_scores, key=log_scores.get)
+        top = log_scores[best]
+        normalizer = sum(math.exp(s - top) for s in log_scores.values())
+        return best, 1 / normalizer
+
+
+class LocalCategorizer:
+    """Keyword matcher plus per-user classifier that answers confident cases without Gemini"""
+
+    def __init__(self, threshold: float = LOCAL_CATEGORIZER_THRESHOLD, max_users: int = LOCAL_CLASSIFIER_MAX_USERS):
+        self.threshold = threshold
+        self.max_users = max_users
+        self.matcher = KeywordMatcher()
+        # user_id -> (trained_at, classifier or None), least recently used first
+        self._models = OrderedDict()
+        self._training = set()
+
+    async def ensure_trained(self, db, user_id: Optional[str]):
+        """(Re)train the user's classifier from Mongo when it is missing or stale"""
+        if db is None or user_id is None:
+            return
+        model = self._models.get(user_id)
+        if model is not None and time.monotonic() - model[0] < LOCAL_CLASSIFIER_REFRESH_SECONDS:
+            self._models.move_to_end(user_id)
+            return
+        if user_id in self._training:
+            # Another request is already training this user's model; keep using the current one
+            return
+        self._training.add(user_id)
+        try:
+            # Reliable labels only: user corrections, Gemini results, or confident legacy rows
+            cursor = db.transactions.find(
+                {
+                    "user_id": user_id,
+                    "category": {"$ne": None},
+                    "$or": [
+                        {"category_source": {"$in": ["llm", "user"]}},
+                        {"category_source": {"$exists": False}, "confidence_score": {"$gte": 0.8}}
+                    ]
+                },
+                {"description": 1, "type": 1, "category": 1, "_id": 0}
+            ).sort("created_at", -1).limit(LOCAL_CLASSIFIER_MAX_EXAMPLES)
+            examples = [
+                (doc["description"], doc["type"], doc["category"])
+                async for doc in cursor
+            ]
+            classifier = NaiveBayesClassifier().fit(examples) if len(examples) >= LOCAL_CLASSIFIER_MIN_EXAMPLES else None
+            self._models[user_id] = (time.monotonic(), classifier)
+            self._models.move_to_end(user_id)
+            while len(self._models) > self.max_users:
+                self._models.popitem(last=False)
+        finally:
+            self._training.discard(user_id)
+
+    def categorize(self, description: str, transaction_type: str, user_id: Optional[str]) -> Optional[dict]:
+        """
+        Categorize locally when confident
+
+        Returns:
+            categorization dict, or None when the description should go to Gemini
+        """
+        hits = self.matcher.match(description, transaction_type)
+        keyword_category = next(iter(hits)) if len(hits) == 1 else None
+        if len(hits) > 1:
+            # Keywords from several categories: let Gemini decide
+            return None
+
+        prediction = None
+        model = self._models.get(user_id)
+        classifier = model[1] if model is not None else None
+        if classifier is not None:
+            prediction = classifier.predict(description, transaction_type)
+
+        if keyword_category and prediction:
+            category, probability = prediction
+            if category == keyword_category:
+                confidence = 1 - (1 - KEYWORD_CONFIDENCE) * (1 - probability)
+            elif probability >= self.threshold:
+                # Keyword and history disagree
+                return None
+            else:
+                category, confidence = keyword_category, KEYWORD_CONFIDENCE
+        elif keyword_category:
+            category, confidence = keyword_category, KEYWORD_CONFIDENCE
+        elif prediction:
+            category, confidence = prediction
+        else:
+            return None
+
+        if confidence < self.threshold:
+            return None
+        return {"category": category, "confidence_score": round(confidence, 3), "source": "local"}
+
+
+local_categorizer = LocalCategorizer()
@@ -0,0 +1,148 @@
+import json
+import os
+from app.agents.llm_client import estimate_tokens
+
+EXPENSE_CATEGORIES = [
+    "Food & Dining", "Transportation", "Bills & Utilities", "Shopping",
+    "Entertainment", "Healthcare", "Education", "Other Expense"
+]
+INCOME_CATEGORIES = [
+    "Freelance/Gig Income", "Salary", "Business Income", "Investment Returns", "Other Income"
+]
+
+# Upper bound on the estimated tokens of a coaching prompt; category lists shrink to fit
+COACHING_PROMPT_TOKEN_BUDGET = int(os.getenv("COACHING_PROMPT_TOKEN_BUDGET", "400"))
+# Most categories listed per income/expense breakdown before the rest are summed as "Other"
+MAX_PROMPT_CATEGORIES = int(os.getenv("MAX_PROMPT_CATEGORIES", "6"))
+# Longer descriptions are cut; the start identifies the merchant
+MAX_DESCRIPTION_CHARS = 80
+
+# Static preambles: identical on every call, only the data section after them varies
+CATEGORIZATION_PREAMBLE = (
+    "You categorize financial transactions of gig workers in India (amounts in ₹).\n"
+    f"Expense categories: {', '.join(EXPENSE_CATEGORIES)}\n"
+    f"Income categories: {', '.join(INCOME_CATEGORIES)}\n"
+)
+COACHING_INSTRUCTIONS = (
+    "You are a financial coach for gig and informal-sector workers with irregular income (amounts in ₹).\n"
+    "From the summary, give 2-3 insights about their financial behavior that cite specific numbers, "
+    "and 2-3 actionable recommendations suited to irregular income.\n"
+)
+COACHING_PREAMBLE = (
+    COACHING_INSTRUCTIONS
+    + 'Reply with ONLY a JSON object: {"insights":["..."],"recommendations":["..."]}\n'
+)
+# Line-per-item output can be parsed while the response is still streaming
+INSIGHT_PREFIX = "INSIGHT:"
+RECOMMENDATION_PREFIX = "RECOMMENDATION:"
+COACHING_STREAM_PREAMBLE = (
+    COACHING_INSTRUCTIONS
+    + f"Reply with one item per line, each starting with {INSIGHT_PREFIX} or {RECOMMENDATION_PREFIX}, "
+    + "insights first, and nothing else.\n"
+)
+
+
+def compact_json(value) -> str:
+    """JSON without whitespace or ASCII escaping (fewer tokens than indented dumps)"""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _amount(value: float):
+    """Whole rupees are enough for the model and tokenize shorter"""
+    return int(round(value))
+
+
+def _description(description: str) -> str:
+    return description[:MAX_DESCRIPTION_CHARS]
+
+
+def summarize_categories(by_category: dict, limit: int) -> dict:
+    """The largest `limit` categories, with any others summed into one "Other (n)" entry"""
+    ranked = sorted(by_category.items(), key=lambda item: item[1], reverse=True)
+    if len(ranked) > limit:
+        kept, rest = ranked[:max(limit - 1, 0)], ranked[max(limit - 1, 0):]
+        ranked = kept + [(f"Other ({len(rest)})", sum(amount for _, amount in rest))]
+    return {category: _amount(amount) for category, amount in ranked}
+
+
+def categorization_prompt(description: str, amount: float, transaction_type: str) -> str:
+    transaction = {"description": _description(description), "amount": _amount(amount), "type": transaction_type}
+    return (
+        CATEGORIZATION_PREAMBLE
+        + f"Transaction: {compact_json(transaction)}\n"
+        + 'Reply with ONLY a JSON object: {"category":"<category>","confidence_score":<0-1>}'
+    )
+
+
+def batch_categorization_prompt(transactions: list) -> str:
+    """One prompt for many transactions; each row's id is its index in the list"""
+    rows = [
+        [i, _description(txn["description"]), _amount(txn["amount"]), txn["type"]]
+        for i, txn in enumerate(transactions)
+    ]
+    return (
+        CATEGORIZATION_PREAMBLE
+        + f"Transactions as [id,description,amount,type]: {compact_json(rows)}\n"
+        + "Reply with ONLY a JSON array with one object per transaction: "
+        + '[{"id":0,"category":"<category>","confidence_score":<0-1>}]'
+    )
+
+
+def _coaching_summary(analysis: dict, goals: list, limit: int) -> dict:
+    income = analysis["income_analysis"]
+    expense = analysis["expense_analysis"]
+    summary = {
+        "income": _amount(income["total"]),
+        "expenses": _amount(expense["total"]),
+        "net_savings": _amount(analysis["net_savings"]),
+        "savings_rate_pct": round(analysis["savings_rate"], 1),
+        "income_volatility_pct": round(income["volatility"], 1),
+        "income_count": income["count"],
+        "expense_count": expense["count"],
+        "income_by_category": summarize_categories(income["by_category"], limit),
+        "expenses_by_category": summarize_categories(expense["by_category"], limit),
+    }
+    if goals:
+        goal = goals[0]
+        target_date = goal.get("target_date")
+        summary["goal"] = {
+            "save": _amount(goal.get("target_amount", 0)),
+            "by": target_date.strftime("%Y-%m-%d") if hasattr(target_date, "strftime") else target_date,
+        }
+    return summary
+
+
+def coaching_prompt(
+    analysis: dict,
+    goals: list = None,
+    token_budget: int = COACHING_PROMPT_TOKEN_BUDGET,
+    streaming: bool = False
+) -> str:
+    """
+    Coaching prompt within a token budget
+
+    Category breakdowns start at MAX_PROMPT_CATEGORIES entries and are cut
+    down (the remainder summed as "Other") until the estimated prompt size
+    fits token_budget, so the prompt stays bounded however many categories
+    a user has.
+
+    Args:
+        streaming: Ask for prefixed lines (see parse_coaching_line) instead of JSON
+    """
+    preamble = COACHING_STREAM_PREAMBLE if streaming else COACHING_PREAMBLE
+    limit = MAX_PROMPT_CATEGORIES
+    while True:
+        prompt = preamble + f"Summary: {compact_json(_coaching_summary(analysis, goals, limit))}"
+        if estimate_tokens(prompt) <= token_budget or limit <= 1:
+            return prompt
+        limit -= 1
+
+
+def parse_coaching_line(line: str):
+    """("insight" | "recommendation", text) for one line of a streamed coaching reply, else None"""
+    line = line.strip().lstrip("-*• ").strip()
+    for prefix, kind in ((INSIGHT_PREFIX, "insight"), (RECOMMENDATION_PREFIX, "recommendation")):
+        if line.upper().startswith(prefix):
+            text = line[len(prefix):].strip().lstrip("*").strip()
+            return (kind, text) if text else None
+    return None
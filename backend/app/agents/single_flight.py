@@ -0,0 +1,75 @@
+import asyncio
+from app.metrics import registry
+
+single_flight_requests = registry.counter("single_flight_requests_total", "Coalesced work requests by flight and role (leader/follower)")
+
+
+class FlightAbandonedError(Exception):
+    """Raised to followers when the leader was cancelled before finishing"""
+
+
+class SingleFlight:
+    """
+    Shares one in-flight computation between concurrent callers with the same key
+
+    The first caller for a key (the leader) does the work; callers arriving
+    while it runs (followers) wait for the same result, and an error is
+    raised to every one of them. Followers wait at most `timeout` (the
+    leader's work carries its own, e.g. the LLM client's), and a follower
+    giving up never cancels the shared work. Keys are forgotten as soon as
+    their work finishes, so nothing is cached here.
+    """
+
+    def __init__(self, name: str, timeout: float):
+        self.name = name
+        self.timeout = timeout
+        self._flights = {}
+
+    def claim(self, key) -> tuple:
+        """
+        Join the flight for key, starting one if none is running
+
+        Returns:
+            (future, is_leader); a leader must call resolve() exactly once
+        """
+        future = self._flights.get(key)
+        if future is not None:
+            single_flight_requests.inc(flight=self.name, role="follower")
+            return future, False
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        single_flight_requests.inc(flight=self.name, role="leader")
+        return future, True
+
+    def resolve(self, key, future: asyncio.Future, result=None, error: BaseException = None):
+        """Publish the leader's result (or error) to every follower and end the flight"""
+        if self._flights.get(key) is future:
+            del self._flights[key]
+        if future.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            # Followers should not be cancelled along with the leader's request
+            error = FlightAbandonedError(f"{self.name} flight {key!r} was cancelled")
+        if error is not None:
+            future.set_exception(error)
+            # Marks the error as retrieved when nobody else was waiting
+            future.exception()
+        else:
+            future.set_result(result)
+
+    async def wait(self, future: asyncio.Future, timeout: float = None):
+        """Wait for a flight's result; raises asyncio.TimeoutError after timeout"""
+        return await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+
+    async def do(self, key, func):
+        """Run func() once for all concurrent callers with the same key"""
+        future, leader = self.claim(key)
+        if not leader:
+            return await self.wait(future)
+        try:
+            result = await func()
+        except BaseException as e:
+            self.resolve(key, future, error=e)
+            raise
+        self.resolve(key, future, result=result)
+        return result
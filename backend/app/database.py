@@ -1,7 +1,12 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient
+from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING, HASHED, monitoring
 from typing import Optional
+from app.metrics import registry
+from app.users import DEFAULT_USER_ID
+import asyncio
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,23 +14,268 @@ load_dotenv()
 class Database:
     client: Optional[AsyncIOMotorClient] = None
     db = None
+    loop = None
+    indexes_ensured = False
 
 db = Database()
 
+pool_in_use = registry.gauge("mongo_pool_connections_in_use", "Connections checked out of the pool")
+pool_open = registry.gauge("mongo_pool_connections_open", "Connections open in the pool")
+pool_checkout_wait = registry.histogram("mongo_pool_checkout_wait_seconds", "Time spent waiting to check out a connection")
+pool_checkout_failures = registry.counter("mongo_pool_checkout_failures_total", "Failed connection checkouts by reason")
+command_latency = registry.histogram("mongo_command_duration_seconds", "MongoDB command round-trip time by command and collection")
+command_failures = registry.counter("mongo_command_failures_total", "Failed MongoDB commands by command")
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Feeds pool checkout wait time and connection counts into the metrics registry"""
+    
+    def __init__(self):
+        # Checkout runs synchronously on the calling thread, so start times are thread-local
+        self._local = threading.local()
+    
+    def connection_check_out_started(self, event):
+        self._local.started_at = time.perf_counter()
+    
+    def connection_checked_out(self, event):
+        started_at = getattr(self._local, "started_at", None)
+        if started_at is not None:
+            pool_checkout_wait.observe(time.perf_counter() - started_at)
+        pool_in_use.inc()
+    
+    def connection_check_out_failed(self, event):
+        pool_checkout_failures.inc(reason=str(event.reason))
+    
+    def connection_checked_in(self, event):
+        pool_in_use.dec()
+    
+    def connection_created(self, event):
+        pool_open.inc()
+    
+    def connection_closed(self, event):
+        pool_open.dec()
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        pass
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_ready(self, event):
+        pass
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Times every MongoDB command (find, aggregate, insert, ...) into the metrics registry"""
+    
+    def __init__(self):
+        # Collection names are only on the started event; keyed by request id until the reply
+        self._collections = {}
+    
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if isinstance(collection, str):
+            self._collections[(event.connection_id, event.request_id)] = collection
+    
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        command_latency.observe(event.duration_micros / 1_000_000, command=event.command_name, collection=collection)
+    
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        command_latency.observe(event.duration_micros / 1_000_000, command=event.command_name, collection=collection)
+        command_failures.inc(command=event.command_name)
+
+def client_options() -> dict:
+    """Motor client options from the environment"""
+    options = {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "60000")),
+        "waitQueueTimeoutMS": int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+        "connectTimeoutMS": int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "socketTimeoutMS": int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "20000")),
+        "readPreference": os.getenv("MONGODB_READ_PREFERENCE", "primary"),
+        "retryWrites": True,
+        "event_listeners": [PoolMetricsListener(), CommandMetricsListener()],
+    }
+    compressors = os.getenv("MONGODB_COMPRESSORS", "zlib")
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+# Indexes backing the route queries, per collection. Every user-owned index starts with
+# user_id, so each query stays within one user's data (and one shard, see SHARD_KEYS)
+INDEXES = {
+    "transactions": [
+        IndexModel([("user_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], name="user_date_id"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created_at"),
+        # Content hash of (user, day, amount, type, description); documents from before it have none
+        IndexModel(
+            [("user_id", ASCENDING), ("fingerprint", ASCENDING)],
+            name="user_fingerprint",
+            unique=True,
+            partialFilterExpression={"fingerprint": {"$exists": True}}
+        ),
+    ],
+    "goals": [
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING)], name="user_status"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created_at"),
+    ],
+    "user_summaries": [
+        IndexModel([("user_id", ASCENDING), ("granularity", ASCENDING), ("bucket", DESCENDING)], name="user_granularity_bucket"),
+    ],
+    "category_cache": [
+        IndexModel(
+            [("updated_at", ASCENDING)],
+            name="updated_at_ttl",
+            expireAfterSeconds=int(os.getenv("CATEGORY_CACHE_MONGO_TTL_DAYS", "30")) * 86400
+        ),
+    ],
+    # Identical-row counts of CSV imports in progress (see CSVImport._fingerprint_batch)
+    "import_occurrences": [
+        IndexModel([("import_id", ASCENDING), ("base", ASCENDING)], name="import_base", unique=True),
+        # Left behind by imports that failed
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=7 * 86400),
+    ],
+    "insight_cache": [
+        IndexModel([("user_id", ASCENDING)], name="user"),
+        # Entries for data that never changes again would otherwise stay forever
+        IndexModel(
+            [("updated_at", ASCENDING)],
+            name="updated_at_ttl",
+            expireAfterSeconds=int(os.getenv("INSIGHT_CACHE_MONGO_TTL_DAYS", "7")) * 86400
+        ),
+    ],
+}
+
+# Hashed shard keys for user-owned collections: users spread evenly over the shards while
+# each user's documents stay together, and every route query filters on the key.
+# category_cache (shared between users) and import_jobs (small, claimed across users)
+# stay unsharded.
+SHARD_KEYS = {
+    "transactions": {"user_id": HASHED},
+    "goals": {"user_id": HASHED},
+    "user_summaries": {"user_id": HASHED},
+    "insight_cache": {"user_id": HASHED},
+    # Documents are keyed by the user id itself
+    "data_versions": {"_id": HASHED},
+}
+
+# Representative route queries checked by the diagnostic mode: (collection, filter, sort)
+DIAGNOSTIC_QUERIES = [
+    ("transactions", {"user_id": DEFAULT_USER_ID}, [("date", -1), ("_id", -1)]),
+    ("transactions", {"user_id": DEFAULT_USER_ID}, [("created_at", -1)]),
+    ("goals", {"user_id": DEFAULT_USER_ID}, [("created_at", -1)]),
+    ("goals", {"user_id": DEFAULT_USER_ID, "status": "active"}, None),
+    ("user_summaries", {"user_id": DEFAULT_USER_ID, "granularity": "month"}, [("bucket", -1)]),
+]
+
+async def ensure_indexes(database):
+    """Create the indexes in INDEXES (no-op for indexes that already exist)"""
+    for collection, indexes in INDEXES.items():
+        try:
+            await database[collection].create_indexes(indexes)
+        except Exception as e:
+            print(f"⚠️  Could not create indexes on {collection}: {str(e)}")
+
+async def shard_collections(client, database):
+    """
+    Shard the collections in SHARD_KEYS (requires a mongos)
+    
+    The hashed index each key needs is created first, since collections
+    that already hold data are not indexed by shardCollection.
+    """
+    try:
+        await client.admin.command("enableSharding", database.name)
+    except Exception as e:
+        print(f"⚠️  Could not enable sharding on {database.name}: {str(e)}")
+        return
+    for collection, key in SHARD_KEYS.items():
+        try:
+            await database[collection].create_index(list(key.items()))
+            await client.admin.command("shardCollection", f"{database.name}.{collection}", key=key)
+            print(f"✅ Sharded {collection} on {key}")
+        except Exception as e:
+            print(f"⚠️  Could not shard {collection}: {str(e)}")
+
+def _plan_stages(plan: dict) -> list:
+    """Flatten the stage names of an explain() plan tree"""
+    stages = [plan["stage"]] if "stage" in plan else []
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+async def check_query_plans(database) -> list:
+    """
+    Explain the route queries and warn about collection scans or in-memory sorts
+    
+    Returns:
+        list of warning strings
+    """
+    warnings = []
+    for collection, query, sort in DIAGNOSTIC_QUERIES:
+        cursor = database[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            explanation = await cursor.explain()
+        except Exception as e:
+            warnings.append(f"{collection} {query}: explain failed ({str(e)})")
+            continue
+        
+        stages = _plan_stages(explanation.get("queryPlanner", {}).get("winningPlan", {}))
+        if "COLLSCAN" in stages:
+            warnings.append(f"{collection} {query} sort={sort}: COLLSCAN")
+        if "SORT" in stages:
+            warnings.append(f"{collection} {query} sort={sort}: in-memory SORT")
+    
+    for warning in warnings:
+        print(f"⚠️  Query plan: {warning}")
+    return warnings
+
 async def connect_to_mongo():
-    """Connect to MongoDB"""
+    """Connect to MongoDB, reusing the client from a previous (warm) invocation when possible"""
     mongodb_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
     db_name = os.getenv("MONGODB_DB_NAME", "finwise_ai")
+    loop = asyncio.get_running_loop()
     
-    db.client = AsyncIOMotorClient(mongodb_uri)
+    # Motor clients are bound to their event loop, so only reuse on the same loop
+    if db.client is not None and db.loop is loop:
+        print(f"♻️  Reusing MongoDB client: {db_name}")
+    else:
+        db.client = AsyncIOMotorClient(mongodb_uri, **client_options())
+        db.loop = loop
+        print(f"✅ Connected to MongoDB: {db_name}")
     db.db = db.client[db_name]
     
-    print(f"✅ Connected to MongoDB: {db_name}")
+    if not db.indexes_ensured and os.getenv("MONGODB_ENSURE_INDEXES", "true").lower() == "true":
+        await ensure_indexes(db.db)
+        db.indexes_ensured = True
+        if os.getenv("MONGODB_SHARD_COLLECTIONS", "false").lower() == "true":
+            await shard_collections(db.client, db.db)
+    if os.getenv("MONGODB_QUERY_DIAGNOSTICS", "false").lower() == "true":
+        await check_query_plans(db.db)
+
+def keep_client_on_shutdown() -> bool:
+    """Serverless workers keep the client between invocations (default on Vercel)"""
+    default = "true" if os.getenv("VERCEL") else "false"
+    return os.getenv("MONGODB_KEEP_CLIENT_ON_SHUTDOWN", default).lower() == "true"
 
-async def close_mongo_connection():
-    """Close MongoDB connection"""
-    if db.client:
+async def close_mongo_connection(force: bool = False):
+    """Close MongoDB connection (kept open for reuse on serverless unless forced)"""
+    if db.client and (force or not keep_client_on_shutdown()):
         db.client.close()
+        db.client = None
+        db.loop = None
         print("❌ Closed MongoDB connection")
 
 def get_database():
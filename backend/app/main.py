@@ -1,10 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
 from contextlib import asynccontextmanager
-from app.database import connect_to_mongo, close_mongo_connection
+from app.database import connect_to_mongo, close_mongo_connection, get_database
 from app.routes import transactions, insights, goals
+from app.responses import FastJSONResponse
+from app.middleware import CompressionMiddleware, MetricsMiddleware
+from app.metrics import render_prometheus, PROMETHEUS_CONTENT_TYPE
+from app.static_assets import StaticAssets
+from app.services.import_jobs import import_queue
+from app.agents.llm_client import gemini_breaker
 import os
 from pathlib import Path
 
@@ -12,15 +17,18 @@ from pathlib import Path
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    await import_queue.start(get_database(), transactions.data_agent)
     yield
     # Shutdown
+    await import_queue.stop()
     await close_mongo_connection()
 
 app = FastAPI(
     title="FinWise AI API",
     description="AI-powered financial coaching for gig workers",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware
@@ -38,6 +46,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses above COMPRESSION_MINIMUM_SIZE (brotli when available, else gzip)
+app.add_middleware(CompressionMiddleware)
+
+# Outermost, so recorded latency includes compression and CORS handling
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(transactions.router, prefix="/api/transactions", tags=["transactions"])
 app.include_router(insights.router, prefix="/api/insights", tags=["insights"])
@@ -53,22 +67,26 @@ async def root():
 
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy"}
+    # Still serving (with fallbacks) while the Gemini circuit is open
+    llm = gemini_breaker.snapshot()
+    return {
+        "status": "healthy" if llm["state"] == "closed" else "degraded",
+        "llm": llm
+    }
+
+@app.get("/api/metrics", include_in_schema=False)
+async def metrics():
+    """Request, MongoDB, LLM and cache metrics in Prometheus text format"""
+    return Response(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
 
-# Mount static files (frontend build)
-# The frontend dist folder should be at ../frontend/dist relative to backend
+# Serve the frontend build (frontend/dist relative to the repo root)
 static_dir = Path(__file__).parent.parent.parent / "frontend" / "dist"
 
 if static_dir.exists():
-    # Serve static assets (js, css, images)
-    app.mount("/assets", StaticFiles(directory=static_dir / "assets"), name="assets")
+    # Indexed once; lookups, precompressed variants and index.html are served from memory
+    static_assets = StaticAssets(static_dir)
     
-    # Catch-all route to serve index.html for client-side routing
+    # Catch-all route to serve assets, or index.html for client-side routing
     @app.get("/{full_path:path}")
-    async def serve_frontend(full_path: str):
-        # If a file exists, serve it
-        file_path = static_dir / full_path
-        if file_path.is_file():
-            return FileResponse(file_path)
-        # Otherwise serve index.html (for React Router)
-        return FileResponse(static_dir / "index.html")
+    async def serve_frontend(full_path: str, request: Request):
+        return static_assets.response(full_path, request.headers)
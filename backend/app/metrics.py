@@ -0,0 +1,168 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+class Counter:
+    """Monotonically increasing value, optionally split by labels"""
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    def set(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Bucketed distribution of observed values (e.g. latencies)"""
+
+    def __init__(self, name: str, description: str = "", buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> dict:
+        with self._lock:
+            return {
+                key: {"counts": list(s["counts"]), "sum": s["sum"], "count": s["count"]}
+                for key, s in self._series.items()
+            }
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, description: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, description, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(self, name: str, description: str = "", buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, description, buckets=buckets)
+
+    def all(self) -> list:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def snapshot(self) -> dict:
+        """Plain-dict view of every metric, keyed by metric name"""
+        result = {}
+        for metric in self.all():
+            result[metric.name] = {
+                ",".join(f"{k}={v}" for k, v in key) or "value": sample
+                for key, sample in metric.samples().items()
+            }
+        return result
+
+
+registry = MetricsRegistry()
+
+
+# Starlette appends "; charset=utf-8" to text/* media types
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(metrics: MetricsRegistry = registry) -> str:
+    """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for metric in sorted(metrics.all(), key=lambda m: m.name):
+        kind = "histogram" if isinstance(metric, Histogram) else "gauge" if isinstance(metric, Gauge) else "counter"
+        if metric.description:
+            lines.append(f"# HELP {metric.name} {_escape(metric.description)}")
+        lines.append(f"# TYPE {metric.name} {kind}")
+
+        for key, sample in sorted(metric.samples().items()):
+            if kind != "histogram":
+                lines.append(f"{metric.name}{_format_labels(key)} {_format_value(sample)}")
+                continue
+            # Bucket counts are already cumulative (a value counts in every bucket >= it)
+            for bound, count in zip(metric.buckets, sample["counts"]):
+                lines.append(f"{metric.name}_bucket{_format_labels(key, (('le', _format_value(float(bound))),))} {count}")
+            lines.append(f"{metric.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {sample['count']}")
+            lines.append(f"{metric.name}_sum{_format_labels(key)} {_format_value(sample['sum'])}")
+            lines.append(f"{metric.name}_count{_format_labels(key)} {sample['count']}")
+    return "\n".join(lines) + "\n"
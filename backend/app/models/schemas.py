@@ -31,7 +31,7 @@ class TransactionCreate(TransactionBase):
 
 class Transaction(TransactionBase):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
-    user_id: str = "default_user"  # Simplified for MVP
+    user_id: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Config:
@@ -50,7 +50,7 @@ class GoalCreate(GoalBase):
 
 class Goal(GoalBase):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
-    user_id: str = "default_user"
+    user_id: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
     status: str = "active"
 
@@ -65,3 +65,5 @@ class InsightResponse(BaseModel):
     income_analysis: dict
     expense_analysis: dict
     generated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Rule-based insights served while the AI was unavailable
+    fallback: bool = False
@@ -0,0 +1,35 @@
+import orjson
+from bson import ObjectId
+from decimal import Decimal
+from fastapi.responses import JSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value):
+    """Types orjson does not handle natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """Serialize to JSON bytes; datetimes, dataclasses and ObjectIds are encoded directly"""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    orjson-backed JSON response
+
+    Routes that return this class directly skip FastAPI's jsonable_encoder
+    pass and response-model validation; Mongo documents can be returned
+    as-is since ObjectId is encoded on the fly.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -1,24 +1,29 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from app.models.schemas import GoalCreate, Goal
 from app.database import get_database
+from app.users import get_user_id
+from app.responses import FastJSONResponse
 from datetime import datetime
 from bson import ObjectId
+from app.services.versions import bump_data_version, get_data_version, data_etag, etag_matches, not_modified, with_etag
+from app.services.queries import find_goals
 
 router = APIRouter()
 
 @router.post("/", response_model=dict)
-async def create_goal(goal: GoalCreate):
+async def create_goal(goal: GoalCreate, user_id: str = Depends(get_user_id)):
     """Create a new savings goal"""
     db = get_database()
     
     # Prepare goal document
     goal_dict = goal.model_dump()
-    goal_dict["user_id"] = "default_user"
+    goal_dict["user_id"] = user_id
     goal_dict["created_at"] = datetime.utcnow()
     goal_dict["status"] = "active"
     
     # Insert into database
     result = await db.goals.insert_one(goal_dict)
+    await bump_data_version(db, user_id)
     goal_dict["_id"] = str(result.inserted_id)
     
     return {
@@ -27,24 +32,28 @@ async def create_goal(goal: GoalCreate):
     }
 
 @router.get("/")
-async def get_goals():
+async def get_goals(request: Request, user_id: str = Depends(get_user_id)):
     """Get all goals for the user"""
     db = get_database()
     
-    cursor = db.goals.find({"user_id": "default_user"}).sort("created_at", -1)
-    goals = await cursor.to_list(length=100)
+    etag = data_etag(request, user_id, await get_data_version(db, user_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
-    # Convert ObjectId to string
-    for goal in goals:
-        goal["_id"] = str(goal["_id"])
+    goals = await find_goals(db, user_id)
     
-    return {
-        "goals": goals,
+    return with_etag(FastJSONResponse({
+        "goals": [goal.to_dict() for goal in goals],
         "count": len(goals)
-    }
+    }), etag)
 
 @router.patch("/{goal_id}")
-async def update_goal(goal_id: str, current_amount: float = None, status: str = None):
+async def update_goal(
+    goal_id: str,
+    current_amount: float = None,
+    status: str = None,
+    user_id: str = Depends(get_user_id)
+):
     """Update goal progress or status"""
     db = get_database()
     
@@ -59,32 +68,36 @@ async def update_goal(goal_id: str, current_amount: float = None, status: str =
     
     try:
         result = await db.goals.update_one(
-            {"_id": ObjectId(goal_id), "user_id": "default_user"},
+            {"_id": ObjectId(goal_id), "user_id": user_id},
             {"$set": update_data}
         )
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Goal not found")
         
+        await bump_data_version(db, user_id)
+        
         return {"message": "Goal updated successfully"}
     
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{goal_id}")
-async def delete_goal(goal_id: str):
+async def delete_goal(goal_id: str, user_id: str = Depends(get_user_id)):
     """Delete a goal"""
     db = get_database()
     
     try:
         result = await db.goals.delete_one({
             "_id": ObjectId(goal_id),
-            "user_id": "default_user"
+            "user_id": user_id
         })
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Goal not found")
         
+        await bump_data_version(db, user_id)
+        
         return {"message": "Goal deleted successfully"}
     
     except Exception as e:
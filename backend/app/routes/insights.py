@@ -1,38 +1,220 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from app.models.schemas import InsightResponse
 from app.database import get_database
+from app.users import get_user_id
+from app.responses import FastJSONResponse, dumps
 from app.agents.behavioral_coaching_agent import BehavioralCoachingAgent
+from app.services.analytics import aggregate_analysis
+from app.services.summaries import summary_analysis, rebuild_user_summary, get_buckets, covers_window
+from app.services.insight_cache import insight_cache, insight_cache_key, INSIGHTS_STALE_WHILE_REVALIDATE
+from app.services.versions import get_data_version, data_etag, etag_matches, not_modified, with_etag
+from app.services.queries import find_coaching_goals
+from app.services.analytics_engine import load_frame, compute_analysis, compute_trends
 from datetime import datetime
+from typing import Optional
 
 router = APIRouter()
 coaching_agent = BehavioralCoachingAgent()
 
-@router.get("/", response_model=InsightResponse)
-async def get_insights():
-    """Get AI-generated financial insights and coaching"""
-    db = get_database()
-    
-    # Get recent transactions
-    cursor = db.transactions.find({"user_id": "default_user"}).sort("date", -1).limit(100)
-    transactions = await cursor.to_list(length=100)
+async def _load_analysis(db, user_id: str, start_date: Optional[datetime], end_date: Optional[datetime]) -> dict:
+    """The income/expense analysis for a date window (404 if there are no transactions)"""
+    # Read precomputed rollups; fall back to aggregating transactions and backfill them.
+    # Windows with a bound partway through a day always aggregate.
+    if not covers_window(start_date, end_date):
+        analysis = await aggregate_analysis(db, user_id, start_date, end_date)
+    else:
+        analysis = await summary_analysis(db, user_id, start_date, end_date)
+        if analysis is None:
+            analysis = await aggregate_analysis(db, user_id, start_date, end_date)
+            if analysis is not None:
+                await rebuild_user_summary(db, user_id)
     
-    if not transactions:
+    if analysis is None:
         raise HTTPException(
             status_code=404, 
             detail="No transactions found. Add some transactions first to get insights."
         )
+    return analysis
+
+async def _generate_insights(db, user_id: str, start_date: Optional[datetime], end_date: Optional[datetime]) -> dict:
+    """Compute the analysis and AI coaching for a date window"""
+    analysis = await _load_analysis(db, user_id, start_date, end_date)
     
-    # Get user goals
-    goals_cursor = db.goals.find({"user_id": "default_user", "status": "active"})
-    goals = await goals_cursor.to_list(length=10)
+    # Get user goals (only the fields the prompt uses)
+    goals = await find_coaching_goals(db, user_id)
     
     # Generate insights using AI
-    result = await coaching_agent.analyze_and_coach(transactions, goals)
+    result = await coaching_agent.coach(analysis, goals)
     
     return InsightResponse(
         insights=result["insights"],
         recommendations=result["recommendations"],
         income_analysis=result["income_analysis"],
         expense_analysis=result["expense_analysis"],
-        generated_at=datetime.utcnow()
+        generated_at=datetime.utcnow(),
+        fallback=result["fallback"]
+    ).model_dump()
+
+@router.get("/", response_model=InsightResponse)
+async def get_insights(
+    request: Request,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    allow_stale: bool = INSIGHTS_STALE_WHILE_REVALIDATE,
+    user_id: str = Depends(get_user_id)
+):
+    """
+    Get AI-generated financial insights and coaching for an optional date window
+    
+    Results are cached until the user's transactions or goals change; rule-based
+    fallback results (the AI was unavailable) are not cached. With
+    allow_stale, an outdated result is returned at once and refreshed in the
+    background.
+    """
+    db = get_database()
+    
+    version = await get_data_version(db, user_id)
+    etag = data_etag(request, user_id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    payload, fresh = await insight_cache.get_or_compute(
+        db,
+        insight_cache_key(user_id, start_date, end_date),
+        user_id,
+        version,
+        lambda: _generate_insights(db, user_id, start_date, end_date),
+        allow_stale=allow_stale
     )
+    
+    # Payload was built from an InsightResponse already; skip re-validating it
+    response = FastJSONResponse(payload)
+    # A stale payload must not be cached under the current version's ETag
+    return with_etag(response, etag) if fresh else response
+
+def _sse(event: str, data: dict) -> bytes:
+    """One Server-Sent Events message with a JSON payload"""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+def _analysis_event(income_analysis: dict, expense_analysis: dict) -> bytes:
+    """The "analysis" event, derived the same way for live and cached results"""
+    income_total = income_analysis["total"]
+    net_savings = income_total - expense_analysis["total"]
+    return _sse("analysis", {
+        "income_analysis": income_analysis,
+        "expense_analysis": expense_analysis,
+        "net_savings": net_savings,
+        "savings_rate": (net_savings / income_total * 100) if income_total > 0 else 0
+    })
+
+async def _insight_events(db, user_id: str, key: str, version: int, cached: Optional[dict], analysis: Optional[dict], goals: list):
+    if cached is not None:
+        # Unchanged data: replay the cached result
+        payload = cached["payload"]
+        yield _analysis_event(payload["income_analysis"], payload["expense_analysis"])
+        for text in payload["insights"]:
+            yield _sse("insight", {"text": text})
+        for text in payload["recommendations"]:
+            yield _sse("recommendation", {"text": text})
+        yield _sse("done", {"generated_at": payload["generated_at"], "cached": True})
+        return
+    
+    # The deterministic analysis goes out before the model is called
+    yield _analysis_event(analysis["income_analysis"], analysis["expense_analysis"])
+    
+    items = {"insight": [], "recommendation": []}
+    fallback = False
+    async for kind, text in coaching_agent.stream_insights(analysis, goals):
+        if kind == "fallback":
+            fallback = True
+            continue
+        items[kind].append(text)
+        yield _sse(kind, {"text": text})
+    
+    payload = InsightResponse(
+        insights=items["insight"],
+        recommendations=items["recommendation"],
+        income_analysis=analysis["income_analysis"],
+        expense_analysis=analysis["expense_analysis"],
+        generated_at=datetime.utcnow(),
+        fallback=fallback
+    ).model_dump()
+    # The completed result also serves later GET /api/insights/ requests (fallbacks are skipped)
+    await insight_cache.set(db, key, user_id, version, payload)
+    yield _sse("done", {"generated_at": payload["generated_at"], "cached": False, "fallback": fallback})
+
+@router.get("/stream")
+async def stream_insights(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    user_id: str = Depends(get_user_id)
+):
+    """
+    Server-Sent Events variant of GET /
+    
+    Emits an "analysis" event with the computed income/expense analysis at
+    once, then one "insight" or "recommendation" event per item as the model
+    streams them, and finally "done". Events carry JSON data.
+    """
+    db = get_database()
+    
+    version = await get_data_version(db, user_id)
+    key = insight_cache_key(user_id, start_date, end_date)
+    cached = await insight_cache.get(db, key, user_id)
+    analysis = goals = None
+    if cached is None or cached["version"] != version:
+        cached = None
+        # Raised here, before the stream starts, so a missing dataset is still a plain 404
+        analysis = await _load_analysis(db, user_id, start_date, end_date)
+        goals = await find_coaching_goals(db, user_id)
+    
+    return StreamingResponse(
+        _insight_events(db, user_id, key, version, cached, analysis, goals),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/analytics")
+async def get_analytics(
+    request: Request,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    user_id: str = Depends(get_user_id)
+):
+    """Get detailed analytics: the income/expense analysis plus weekly, percentile and monthly trends"""
+    db = get_database()
+    
+    etag = data_etag(request, user_id, await get_data_version(db, user_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    frame = await load_frame(db, user_id, start_date, end_date)
+    if frame.empty:
+        raise HTTPException(
+            status_code=404, 
+            detail="No transactions found. Add some transactions first to get insights."
+        )
+    
+    return with_etag(FastJSONResponse({
+        "analysis": compute_analysis(frame),
+        "trends": compute_trends(frame)
+    }), etag)
+
+@router.get("/summary")
+async def get_summary(granularity: str = "month", limit: int = 12, user_id: str = Depends(get_user_id)):
+    """Get precomputed income/expense totals without AI coaching (for dashboards)"""
+    if granularity not in ("day", "month"):
+        raise HTTPException(status_code=400, detail="granularity must be 'day' or 'month'")
+    
+    db = get_database()
+    
+    analysis = await summary_analysis(db, user_id)
+    if analysis is None:
+        await rebuild_user_summary(db, user_id)
+        analysis = await summary_analysis(db, user_id)
+    
+    return {
+        "analysis": analysis,
+        "buckets": await get_buckets(db, user_id, granularity, limit)
+    }
@@ -1,36 +1,86 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response, Request
 from app.models.schemas import TransactionCreate, Transaction
 from app.database import get_database
+from app.users import get_user_id
+from app.responses import FastJSONResponse
 from app.agents.data_analysis_agent import DataAnalysisAgent
+from app.services.category_cache import category_cache
+from app.services.summaries import apply_transactions
+from app.services.versions import bump_data_version, get_data_version, data_etag, etag_matches, not_modified, with_etag
+from app.services.csv_import import CSVImport
+from app.services.fingerprints import fingerprint_document, next_free_fingerprint
+from app.services.queries import (
+    TransactionRecord, find_transactions, TRANSACTION_ROLLUP_PROJECTION
+)
+from app.services.import_jobs import import_queue, IMPORT_ASYNC_THRESHOLD_BYTES
 from datetime import datetime
 from bson import ObjectId
-import csv
-import io
+from pymongo.errors import DuplicateKeyError
+from typing import Optional
+import base64
+import json
 
 router = APIRouter()
 data_agent = DataAnalysisAgent()
 
+# Concurrent identical creates race for the same occurrence number; each loser tries the next
+MAX_CREATE_ATTEMPTS = 3
+
 @router.post("/", response_model=dict)
-async def create_transaction(transaction: TransactionCreate):
-    """Create a new transaction with AI categorization"""
+async def create_transaction(
+    transaction: TransactionCreate,
+    reject_duplicates: bool = False,
+    user_id: str = Depends(get_user_id)
+):
+    """
+    Create a new transaction with AI categorization
+    
+    Identical transactions on the same day (a second equal ride or order) are
+    recorded as separate occurrences. With reject_duplicates, a transaction
+    the user already has is answered with 409 instead.
+    """
     db = get_database()
     
+    # Checked before paying for categorization
+    if reject_duplicates:
+        fingerprint = fingerprint_document(user_id, transaction.model_dump())
+        if await db.transactions.find_one({"user_id": user_id, "fingerprint": fingerprint}, {"_id": 1}):
+            raise HTTPException(status_code=409, detail="This transaction has already been recorded")
+    
     # Get AI categorization
     categorization = await data_agent.categorize_transaction(
         description=transaction.description,
         amount=transaction.amount,
-        transaction_type=transaction.type
+        transaction_type=transaction.type,
+        user_id=user_id
     )
     
     # Prepare transaction document
     transaction_dict = transaction.model_dump()
     transaction_dict["category"] = categorization["category"]
     transaction_dict["confidence_score"] = categorization["confidence_score"]
-    transaction_dict["user_id"] = "default_user"
+    transaction_dict["category_source"] = categorization["source"]
+    transaction_dict["user_id"] = user_id
     transaction_dict["created_at"] = datetime.utcnow()
     
-    # Insert into database
-    result = await db.transactions.insert_one(transaction_dict)
+    # Insert into database; the unique fingerprint index catches concurrent identical
+    # creates, which retry with the next free occurrence
+    for attempt in range(MAX_CREATE_ATTEMPTS):
+        if not reject_duplicates:
+            fingerprint = await next_free_fingerprint(db, user_id, transaction_dict)
+        transaction_dict.pop("_id", None)
+        if fingerprint is None:
+            transaction_dict.pop("fingerprint", None)
+        else:
+            transaction_dict["fingerprint"] = fingerprint
+        try:
+            result = await db.transactions.insert_one(transaction_dict)
+            break
+        except DuplicateKeyError:
+            if reject_duplicates or attempt == MAX_CREATE_ATTEMPTS - 1:
+                raise HTTPException(status_code=409, detail="This transaction has already been recorded")
+    await apply_transactions(db, [transaction_dict])
+    await bump_data_version(db, user_id)
     transaction_dict["_id"] = str(result.inserted_id)
     
     return {
@@ -38,109 +88,159 @@ async def create_transaction(transaction: TransactionCreate):
         "transaction": transaction_dict
     }
 
+def _encode_cursor(txn: TransactionRecord) -> str:
+    """Opaque pagination cursor for the position after a transaction"""
+    raw = json.dumps({"d": txn.date.isoformat(), "i": txn.id})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(raw["d"]), ObjectId(raw["i"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/")
-async def get_transactions(limit: int = 100, skip: int = 0):
-    """Get all transactions for the user"""
+async def get_transactions(
+    request: Request,
+    limit: int = 100,
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_user_id)
+):
+    """
+    Get transactions for the user, newest first
+    
+    Pass the returned next_cursor as cursor to fetch the following page; it
+    seeks on the (user_id, date, _id) index instead of skipping documents.
+    limit/skip paging remains available.
+    """
     db = get_database()
     
-    cursor = db.transactions.find({"user_id": "default_user"}).sort("date", -1).skip(skip).limit(limit)
-    transactions = await cursor.to_list(length=limit)
+    etag = data_etag(request, user_id, await get_data_version(db, user_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
-    # Convert ObjectId to string
-    for txn in transactions:
-        txn["_id"] = str(txn["_id"])
+    query = {"user_id": user_id}
+    if cursor:
+        after_date, after_id = _decode_cursor(cursor)
+        query["$or"] = [
+            {"date": {"$lt": after_date}},
+            {"date": after_date, "_id": {"$lt": after_id}}
+        ]
     
-    return {
-        "transactions": transactions,
-        "count": len(transactions)
-    }
+    transactions = await find_transactions(
+        db,
+        query,
+        [("date", -1), ("_id", -1)],
+        limit,
+        skip=0 if cursor else skip
+    )
+    
+    next_cursor = _encode_cursor(transactions[-1]) if transactions and len(transactions) == limit else None
+    
+    return with_etag(FastJSONResponse({
+        "transactions": [txn.to_dict() for txn in transactions],
+        "count": len(transactions),
+        "next_cursor": next_cursor
+    }), etag)
 
 @router.post("/bulk")
-async def upload_transactions_csv(file: UploadFile = File(...)):
-    """Upload transactions via CSV file"""
+async def upload_transactions_csv(
+    response: Response,
+    file: UploadFile = File(...),
+    background: Optional[bool] = None,
+    user_id: str = Depends(get_user_id)
+):
+    """
+    Upload transactions via CSV file (streamed and committed in batches)
+    
+    Large files (or background=true) are queued as an import job and answered
+    with 202 and a job_id to poll at /api/transactions/imports/{job_id}.
+    """
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Only CSV files are allowed")
     
     db = get_database()
     
-    # Read CSV content
-    contents = await file.read()
-    csv_data = contents.decode('utf-8')
-    csv_reader = csv.DictReader(io.StringIO(csv_data))
+    if background is None:
+        background = (file.size or 0) >= IMPORT_ASYNC_THRESHOLD_BYTES
     
-    transactions_added = []
-    errors = []
+    if background:
+        job_id = await import_queue.submit(file, user_id)
+        response.status_code = 202
+        return {
+            "message": "Import queued",
+            "job_id": job_id,
+            "status_url": f"/api/transactions/imports/{job_id}"
+        }
     
-    for row_num, row in enumerate(csv_reader, start=2):
-        try:
-            # Parse row (expected columns: date, amount, type, description)
-            date_str = row.get('date', '').strip()
-            amount = float(row.get('amount', 0))
-            txn_type = row.get('type', '').strip().lower()
-            description = row.get('description', '').strip()
-            
-            # Validate
-            if not date_str or not amount or txn_type not in ['income', 'expense'] or not description:
-                errors.append(f"Row {row_num}: Invalid or missing data")
-                continue
-            
-            # Parse date
-            try:
-                date = datetime.fromisoformat(date_str)
-            except:
-                try:
-                    date = datetime.strptime(date_str, '%Y-%m-%d')
-                except:
-                    errors.append(f"Row {row_num}: Invalid date format")
-                    continue
-            
-            # Get AI categorization
-            categorization = await data_agent.categorize_transaction(
-                description=description,
-                amount=amount,
-                transaction_type=txn_type
-            )
-            
-            # Create transaction document
-            transaction_dict = {
-                "date": date,
-                "amount": amount,
-                "type": txn_type,
-                "description": description,
-                "category": categorization["category"],
-                "confidence_score": categorization["confidence_score"],
-                "user_id": "default_user",
-                "created_at": datetime.utcnow()
-            }
-            
-            # Insert into database
-            result = await db.transactions.insert_one(transaction_dict)
-            transaction_dict["_id"] = str(result.inserted_id)
-            transactions_added.append(transaction_dict)
+    csv_import = CSVImport(db, data_agent, user_id)
+    return await csv_import.run(file)
+
+@router.get("/imports/{job_id}")
+async def get_import_job(job_id: str, user_id: str = Depends(get_user_id)):
+    """Get progress of a background CSV import"""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job id")
+    
+    job = await import_queue.get(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    
+    return job
+
+@router.patch("/{transaction_id}/category")
+async def correct_transaction_category(transaction_id: str, category: str, user_id: str = Depends(get_user_id)):
+    """Correct a transaction's category and invalidate the cached categorization"""
+    db = get_database()
+    
+    try:
+        txn = await db.transactions.find_one_and_update(
+            {"_id": ObjectId(transaction_id), "user_id": user_id},
+            {"$set": {"category": category, "confidence_score": 1.0, "category_source": "user"}},
+            projection=TRANSACTION_ROLLUP_PROJECTION
+        )
+        
+        if txn is None:
+            raise HTTPException(status_code=404, detail="Transaction not found")
+        
+        # Move the amount from the old category to the new one in the rollups
+        await apply_transactions(db, [txn], sign=-1)
+        await apply_transactions(db, [{**txn, "category": category}])
+        await bump_data_version(db, user_id)
+        await category_cache.invalidate(txn["description"], txn["type"])
         
-        except Exception as e:
-            errors.append(f"Row {row_num}: {str(e)}")
+        return {"message": "Transaction category updated successfully"}
     
-    return {
-        "message": f"Processed {len(transactions_added)} transactions",
-        "transactions_added": len(transactions_added),
-        "errors": errors
-    }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/category-cache")
+async def invalidate_category_cache(description: str, type: str, user_id: str = Depends(get_user_id)):
+    """Remove a description from the categorization cache (shared by all users, so only signed-in ones may)"""
+    key = await category_cache.invalidate(description, type)
+    return {"message": "Category cache entry invalidated", "key": key}
 
 @router.delete("/{transaction_id}")
-async def delete_transaction(transaction_id: str):
+async def delete_transaction(transaction_id: str, user_id: str = Depends(get_user_id)):
     """Delete a transaction"""
     db = get_database()
     
     try:
-        result = await db.transactions.delete_one({
-            "_id": ObjectId(transaction_id),
-            "user_id": "default_user"
-        })
+        txn = await db.transactions.find_one_and_delete(
+            {"_id": ObjectId(transaction_id), "user_id": user_id},
+            projection=TRANSACTION_ROLLUP_PROJECTION
+        )
         
-        if result.deleted_count == 0:
+        if txn is None:
             raise HTTPException(status_code=404, detail="Transaction not found")
         
+        await apply_transactions(db, [txn], sign=-1)
+        await bump_data_version(db, user_id)
+        
         return {"message": "Transaction deleted successfully"}
     
     except Exception as e:
@@ -0,0 +1,117 @@
+from datetime import datetime
+from typing import Optional
+
+
+def build_analysis(
+    income_by_category: dict,
+    expense_by_category: dict,
+    income_count: int,
+    expense_count: int,
+    volatility: float
+) -> dict:
+    """Assemble the analysis structure from per-category totals and counts"""
+    income_total = sum(income_by_category.values())
+    expense_total = sum(expense_by_category.values())
+    
+    return {
+        "income_analysis": {
+            "total": income_total,
+            "by_category": income_by_category,
+            "count": income_count,
+            "volatility": round(volatility, 2)
+        },
+        "expense_analysis": {
+            "total": expense_total,
+            "by_category": expense_by_category,
+            "count": expense_count,
+            "top_categories": sorted(
+                expense_by_category.items(), 
+                key=lambda x: x[1], 
+                reverse=True
+            )[:3]
+        },
+        "net_savings": income_total - expense_total,
+        "savings_rate": ((income_total - expense_total) / income_total * 100) if income_total > 0 else 0
+    }
+
+
+def date_window_filter(user_id: str, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> dict:
+    """Transaction filter for a user and an optional [start_date, end_date) window"""
+    query = {"user_id": user_id}
+    if start_date or end_date:
+        query["date"] = {}
+        if start_date:
+            query["date"]["$gte"] = start_date
+        if end_date:
+            query["date"]["$lt"] = end_date
+    return query
+
+
+async def aggregate_analysis(
+    db,
+    user_id: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Optional[dict]:
+    """
+    Compute the behavioral analysis summary inside MongoDB
+    
+    Only per-category totals and income statistics come back over the
+    wire, so the cost no longer depends on how many transactions are
+    shipped to Python.
+    
+    Returns:
+        analysis dict (same shape as BehavioralCoachingAgent._prepare_analysis),
+        or None when the window has no transactions
+    """
+    is_income = {"$eq": ["$type", "income"]}
+    pipeline = [
+        {"$match": date_window_filter(user_id, start_date, end_date)},
+        {"$facet": {
+            "by_category": [
+                {"$group": {
+                    "_id": {
+                        "income": is_income,
+                        "category": {"$ifNull": ["$category", "Uncategorized"]}
+                    },
+                    "total": {"$sum": "$amount"},
+                    "count": {"$sum": 1}
+                }}
+            ],
+            "income_stats": [
+                {"$match": {"type": "income"}},
+                {"$group": {
+                    "_id": None,
+                    "count": {"$sum": 1},
+                    "mean": {"$avg": "$amount"},
+                    "std_dev": {"$stdDevPop": "$amount"}
+                }}
+            ]
+        }}
+    ]
+    
+    results = await db.transactions.aggregate(pipeline).to_list(length=1)
+    facets = results[0] if results else {"by_category": [], "income_stats": []}
+    if not facets["by_category"]:
+        return None
+    
+    income_by_category = {}
+    expense_by_category = {}
+    income_count = 0
+    expense_count = 0
+    for group in facets["by_category"]:
+        category = group["_id"]["category"]
+        if group["_id"]["income"]:
+            income_by_category[category] = group["total"]
+            income_count += group["count"]
+        else:
+            expense_by_category[category] = group["total"]
+            expense_count += group["count"]
+    
+    volatility = 0
+    if facets["income_stats"]:
+        stats = facets["income_stats"][0]
+        if stats["count"] > 1 and stats["mean"] and stats["mean"] > 0:
+            volatility = stats["std_dev"] / stats["mean"] * 100
+    
+    return build_analysis(income_by_category, expense_by_category, income_count, expense_count, volatility)
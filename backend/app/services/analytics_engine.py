@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Optional
+from app.services.analytics import build_analysis, date_window_filter
+
+COLUMNS = ["date", "amount", "type", "category"]
+SPENDING_PERCENTILES = [50, 75, 90, 95]
+ROLLING_WEEKS = 4
+
+
+def to_frame(transactions: list) -> pd.DataFrame:
+    """Columnar frame (date, amount, type, category) from transaction documents"""
+    return columns_to_frame({
+        column: [txn.get(column) for txn in transactions]
+        for column in COLUMNS
+    })
+
+
+def columns_to_frame(columns: dict) -> pd.DataFrame:
+    frame = pd.DataFrame({
+        "date": pd.to_datetime(columns["date"], utc=True, errors="coerce"),
+        "amount": pd.to_numeric(pd.Series(columns["amount"], dtype="object"), errors="coerce"),
+        "type": pd.Series(columns["type"], dtype="object"),
+        "category": pd.Series(columns["category"], dtype="object").fillna("Uncategorized"),
+    })
+    frame["amount"] = frame["amount"].fillna(0.0).astype("float64")
+    return frame
+
+
+async def load_frame(
+    db,
+    user_id: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> pd.DataFrame:
+    """Stream a user's transactions straight into column lists (only the fields analytics needs)"""
+    columns = {column: [] for column in COLUMNS}
+    cursor = db.transactions.find(
+        date_window_filter(user_id, start_date, end_date),
+        {"_id": 0, "date": 1, "amount": 1, "type": 1, "category": 1}
+    ).batch_size(5000)
+    async for doc in cursor:
+        for column in COLUMNS:
+            columns[column].append(doc.get(column))
+    return columns_to_frame(columns)
+
+
+def _to_dict(series: pd.Series) -> dict:
+    return {str(key): float(value) for key, value in series.items()}
+
+
+def compute_analysis(frame: pd.DataFrame) -> dict:
+    """The income/expense analysis computed in vectorized passes"""
+    is_income = (frame["type"] == "income").to_numpy()
+    amounts = frame["amount"].to_numpy()
+    income = frame[is_income]
+    expense = frame[~is_income]
+
+    income_amounts = amounts[is_income]
+    volatility = 0
+    if income_amounts.size > 1:
+        mean = income_amounts.mean()
+        # Population standard deviation, as before
+        volatility = (income_amounts.std() / mean * 100) if mean > 0 else 0
+
+    return build_analysis(
+        _to_dict(income.groupby("category", sort=False)["amount"].sum()),
+        _to_dict(expense.groupby("category", sort=False)["amount"].sum()),
+        int(is_income.sum()),
+        int((~is_income).sum()),
+        float(volatility)
+    )
+
+
+def compute_trends(frame: pd.DataFrame, weeks: int = 12, months: int = 12) -> dict:
+    """
+    Richer time-based metrics
+
+    Returns:
+        dict with weekly income (and its rolling average), expense amount
+        percentiles and month-over-month income/expense changes
+    """
+    dated = frame.dropna(subset=["date"]).set_index("date").sort_index()
+    if dated.empty:
+        return {"weekly_income": [], "spending_percentiles": {}, "month_over_month": []}
+    is_income = dated["type"] == "income"
+
+    # Weekly income with a rolling average over the previous weeks
+    weekly = dated.loc[is_income, "amount"].resample("W-SUN").sum()
+    rolling = weekly.rolling(ROLLING_WEEKS, min_periods=1).mean()
+    weekly_income = [
+        {"week_ending": week.strftime("%Y-%m-%d"), "total": float(total), f"rolling_{ROLLING_WEEKS}w_avg": float(avg)}
+        for week, total, avg in zip(weekly.index[-weeks:], weekly.to_numpy()[-weeks:], rolling.to_numpy()[-weeks:])
+    ]
+
+    expense_amounts = dated.loc[~is_income, "amount"].to_numpy()
+    spending_percentiles = {}
+    if expense_amounts.size:
+        values = np.percentile(expense_amounts, SPENDING_PERCENTILES)
+        spending_percentiles = {f"p{p}": float(v) for p, v in zip(SPENDING_PERCENTILES, values)}
+
+    # Month-over-month totals and percentage changes
+    monthly = (
+        dated.assign(kind=np.where(is_income, "income", "expense"))
+        .groupby([pd.Grouper(freq="MS"), "kind"])["amount"].sum()
+        .unstack(fill_value=0.0)
+        .reindex(columns=["income", "expense"], fill_value=0.0)
+    )
+    monthly = monthly.asfreq("MS", fill_value=0.0)
+    changes = monthly.pct_change(fill_method=None).replace([np.inf, -np.inf], np.nan) * 100
+    month_over_month = [
+        {
+            "month": month.strftime("%Y-%m"),
+            "income": float(row["income"]),
+            "expense": float(row["expense"]),
+            "income_change_pct": None if pd.isna(change["income"]) else round(float(change["income"]), 2),
+            "expense_change_pct": None if pd.isna(change["expense"]) else round(float(change["expense"]), 2),
+        }
+        for (month, row), (_, change) in zip(monthly.tail(months).iterrows(), changes.tail(months).iterrows())
+    ]
+
+    return {
+        "weekly_income": weekly_income,
+        "spending_percentiles": spending_percentiles,
+        "month_over_month": month_over_month,
+    }
@@ -0,0 +1,164 @@
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+from pymongo import UpdateOne
+from app.database import get_database
+from app.metrics import registry
+from app.services.cache import TTLCache
+
+CATEGORY_CACHE_SIZE = int(os.getenv("CATEGORY_CACHE_SIZE", "5000"))
+CATEGORY_CACHE_TTL_SECONDS = float(os.getenv("CATEGORY_CACHE_TTL_SECONDS", "3600"))
+CATEGORY_CACHE_MONGO_TTL_DAYS = int(os.getenv("CATEGORY_CACHE_MONGO_TTL_DAYS", "30"))
+# How often a worker drops memory entries that changed in Mongo (e.g. invalidated by another worker)
+CATEGORY_CACHE_SYNC_SECONDS = float(os.getenv("CATEGORY_CACHE_SYNC_SECONDS", "30"))
+
+cache_hits = registry.counter("category_cache_hits_total", "Categorization cache hits by tier")
+cache_misses = registry.counter("category_cache_misses_total", "Categorization cache misses")
+
+_NON_ALPHA = re.compile(r"[^a-z]+")
+
+
+def normalize_description(description: str) -> str:
+    """Reduce a description to its merchant words (drops case, digits, punctuation)"""
+    return _NON_ALPHA.sub(" ", description.lower()).strip()
+
+
+def cache_key(description: str, transaction_type: str) -> str:
+    return f"{transaction_type}:{normalize_description(description)}"
+
+
+class CategoryCache:
+    """
+    Two-tier categorization cache: in-process LRU in front of the category_cache collection
+
+    Invalidation leaves a tombstone in Mongo with a fresh updated_at. Every
+    CATEGORY_CACHE_SYNC_SECONDS each worker drops the memory entries whose
+    Mongo document changed since its last sync, so a correction made on one
+    worker reaches the others within that interval.
+    """
+
+    def __init__(self):
+        self.memory = TTLCache(max_size=CATEGORY_CACHE_SIZE, ttl_seconds=CATEGORY_CACHE_TTL_SECONDS)
+        self._synced_at = datetime.utcnow()
+        self._syncing = False
+
+    def _collection(self):
+        db = get_database()
+        return db.category_cache if db is not None else None
+
+    def _fresh_after(self) -> datetime:
+        return datetime.utcnow() - timedelta(days=CATEGORY_CACHE_MONGO_TTL_DAYS)
+
+    async def _sync(self, collection):
+        """Drop memory entries whose Mongo document changed since the last sync"""
+        now = datetime.utcnow()
+        if self._syncing or (now - self._synced_at).total_seconds() < CATEGORY_CACHE_SYNC_SECONDS:
+            return
+        self._syncing = True
+        try:
+            # Overlap the previous window so writes stamped by a slightly skewed clock are not missed
+            since = self._synced_at - timedelta(seconds=CATEGORY_CACHE_SYNC_SECONDS)
+            async for doc in collection.find({"updated_at": {"$gte": since}}, {"_id": 1}):
+                self.memory.delete(doc["_id"])
+            self._synced_at = now
+        except Exception as e:
+            print(f"Error syncing category cache: {str(e)}")
+        finally:
+            self._syncing = False
+
+    async def get(self, description: str, transaction_type: str) -> Optional[dict]:
+        """Return the cached categorization for a description, or None"""
+        return (await self.get_many([(description, transaction_type)]))[0]
+
+    async def get_many(self, items: list) -> list:
+        """
+        Look up many (description, type) pairs at once
+        
+        Returns:
+            list of categorization dicts (or None for misses), in input order
+        """
+        collection = self._collection()
+        if collection is not None:
+            await self._sync(collection)
+
+        keys = [cache_key(description, txn_type) for description, txn_type in items]
+        results = [self.memory.get(key) for key in keys]
+        cache_hits.inc(sum(1 for r in results if r is not None), tier="memory")
+        
+        missing = {key for key, result in zip(keys, results) if result is None}
+        if missing and collection is not None:
+            found = {}
+            try:
+                cursor = collection.find(
+                    {
+                        "_id": {"$in": list(missing)},
+                        "updated_at": {"$gte": self._fresh_after()},
+                        "invalidated": {"$ne": True}
+                    },
+                    {"category": 1, "confidence_score": 1}
+                )
+                async for doc in cursor:
+                    found[doc["_id"]] = {
+                        "category": doc["category"],
+                        "confidence_score": doc["confidence_score"]
+                    }
+                    self.memory.set(doc["_id"], found[doc["_id"]])
+            except Exception as e:
+                print(f"Error reading category cache: {str(e)}")
+            for i, key in enumerate(keys):
+                if results[i] is None and key in found:
+                    results[i] = found[key]
+            cache_hits.inc(sum(1 for key in keys if key in found), tier="mongo")
+        
+        cache_misses.inc(sum(1 for r in results if r is None))
+        return [dict(r, source="cache") if r is not None else None for r in results]
+
+    async def set(self, description: str, transaction_type: str, categorization: dict):
+        await self.set_many([(description, transaction_type, categorization)])
+
+    async def set_many(self, entries: list):
+        """Store (description, type, categorization) triples in both tiers"""
+        operations = []
+        now = datetime.utcnow()
+        for description, txn_type, categorization in entries:
+            key = cache_key(description, txn_type)
+            value = {
+                "category": categorization["category"],
+                "confidence_score": categorization["confidence_score"]
+            }
+            self.memory.set(key, value)
+            operations.append(UpdateOne(
+                {"_id": key},
+                {"$set": {
+                    **value,
+                    "normalized_description": normalize_description(description),
+                    "type": txn_type,
+                    "updated_at": now
+                }, "$unset": {"invalidated": ""}},
+                upsert=True
+            ))
+        
+        collection = self._collection()
+        if operations and collection is not None:
+            try:
+                await collection.bulk_write(operations, ordered=False)
+            except Exception as e:
+                print(f"Error writing category cache: {str(e)}")
+
+    async def invalidate(self, description: str, transaction_type: str) -> str:
+        """Drop a description from both tiers; returns the cache key removed"""
+        key = cache_key(description, transaction_type)
+        self.memory.delete(key)
+        collection = self._collection()
+        if collection is not None:
+            # A tombstone rather than a delete, so other workers' syncs see the change
+            await collection.update_one(
+                {"_id": key},
+                {"$set": {"invalidated": True, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        return key
+
+
+category_cache = CategoryCache()
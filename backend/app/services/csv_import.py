@@ -0,0 +1,315 @@
+import codecs
+import csv
+import os
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.services.summaries import apply_transactions
+from app.services.fingerprints import fingerprint_document, find_existing_fingerprints
+from app.services.versions import bump_data_version
+
+CSV_READ_CHUNK_BYTES = int(os.getenv("CSV_READ_CHUNK_BYTES", str(64 * 1024)))
+CSV_IMPORT_BATCH_SIZE = int(os.getenv("CSV_IMPORT_BATCH_SIZE", "500"))
+# Error messages kept in the response; further errors are only counted
+CSV_MAX_REPORTED_ERRORS = int(os.getenv("CSV_MAX_REPORTED_ERRORS", "1000"))
+DUPLICATE_KEY_ERROR = 11000
+
+
+def parse_csv_row(row: dict) -> dict:
+    """Parse and validate one CSV row (expected columns: date, amount, type, description)"""
+    date_str = row.get('date', '').strip()
+    amount = float(row.get('amount', 0))
+    txn_type = row.get('type', '').strip().lower()
+    description = row.get('description', '').strip()
+
+    # Validate
+    if not date_str or not amount or txn_type not in ['income', 'expense'] or not description:
+        raise ValueError("Invalid or missing data")
+
+    # Parse date
+    try:
+        date = datetime.fromisoformat(date_str)
+    except ValueError:
+        try:
+            date = datetime.strptime(date_str, '%Y-%m-%d')
+        except ValueError:
+            raise ValueError("Invalid date format")
+
+    return {
+        "date": date,
+        "amount": amount,
+        "type": txn_type,
+        "description": description
+    }
+
+
+async def iter_csv_records(upload, chunk_size: int = CSV_READ_CHUNK_BYTES):
+    """
+    Yield CSV records (lists of fields) from an UploadFile, reading it in chunks
+
+    Bytes go through an incremental UTF-8 decoder and lines are only handed
+    to the csv module once their quotes balance, so quoted fields may span
+    lines. At most one chunk plus one partial record is held in memory.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    record = []
+    quotes = 0
+
+    while True:
+        chunk = await upload.read(chunk_size)
+        text = pending + decoder.decode(chunk, final=not chunk)
+        lines = [line + "\n" for line in text.split("\n")]
+        # Keep the text after the last newline for the next chunk
+        pending = lines.pop()[:-1]
+        if not chunk and pending:
+            lines.append(pending)
+
+        for line in lines:
+            record.append(line)
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                fields = next(csv.reader(["".join(record)]), [])
+                record = []
+                quotes = 0
+                if fields:
+                    yield fields
+
+        if not chunk:
+            if record:
+                # Unbalanced quote at end of file: let csv parse what is there
+                fields = next(csv.reader(["".join(record)]), [])
+                if fields:
+                    yield fields
+            return
+
+
+class CSVImport:
+    """
+    Streams a CSV upload into the transactions collection in fixed-size batches
+
+    Each batch is categorized, written with one unordered insert_many and
+    folded into the user's rollups before the next batch is read, so memory
+    stays bounded by the batch size rather than the file size. Rows whose
+    fingerprint the user already has are skipped before categorization, so
+    re-uploading an overlapping statement only pays for the new rows.
+    Identical rows within one upload are numbered (see
+    transaction_fingerprint), so genuine repeats are all kept; the counts
+    live in the import_occurrences collection rather than in memory.
+    """
+
+    def __init__(
+        self,
+        db,
+        data_agent,
+        user_id: str,
+        batch_size: int = CSV_IMPORT_BATCH_SIZE,
+        on_progress=None,
+        resume_from: dict = None,
+        import_id: ObjectId = None
+    ):
+        """
+        Args:
+            on_progress: Optional coroutine function called with the progress
+                dict after every committed batch
+            resume_from: Progress saved by an interrupted import; rows it had
+                already read are skipped
+            import_id: Identifies the upload's occurrence counts; a resumed
+                import must pass the same id (background jobs use the job id)
+        """
+        resume_from = resume_from or {}
+        self.db = db
+        self.data_agent = data_agent
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        self.rows_read = resume_from.get("rows_read", 0)
+        self.transactions_added = resume_from.get("transactions_added", 0)
+        self.duplicate_count = resume_from.get("duplicate_count", 0)
+        self.error_count = resume_from.get("error_count", 0)
+        self.errors = list(resume_from.get("errors", []))
+        self.import_id = import_id or ObjectId()
+
+    def _error(self, row_num: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < CSV_MAX_REPORTED_ERRORS:
+            self.errors.append(f"Row {row_num}: {message}")
+
+    def progress(self) -> dict:
+        return {
+            "rows_read": self.rows_read,
+            "transactions_added": self.transactions_added,
+            "duplicate_count": self.duplicate_count,
+            "error_count": self.error_count,
+            "errors": self.errors
+        }
+
+    async def run(self, upload) -> dict:
+        """Import every record of an upload (any object with an async read(size))"""
+        header = None
+        batch = []
+        row_num = 1
+        skip_rows = self.rows_read
+
+        async for fields in iter_csv_records(upload):
+            if header is None:
+                header = [name.strip() for name in fields]
+                continue
+            row_num += 1
+            if row_num - 1 <= skip_rows:
+                # Read, counted and committed before the import was interrupted
+                continue
+            self.rows_read += 1
+            row = dict(zip(header, fields))
+            for name in header[len(fields):]:
+                row[name] = None
+
+            try:
+                parsed = parse_csv_row(row)
+            except Exception as e:
+                self._error(row_num, str(e))
+                continue
+            batch.append((row_num, parsed))
+
+            if len(batch) >= self.batch_size:
+                await self._flush(batch)
+                batch = []
+
+        if batch:
+            await self._flush(batch)
+        await self.db.import_occurrences.delete_many({"import_id": self.import_id})
+
+        message = f"Processed {self.transactions_added} transactions"
+        if self.duplicate_count:
+            message += f" ({self.duplicate_count} duplicates skipped)"
+        return {
+            "message": message,
+            "transactions_added": self.transactions_added,
+            "duplicate_count": self.duplicate_count,
+            "error_count": self.error_count,
+            "errors": self.errors
+        }
+
+    async def _fingerprint_batch(self, batch: list) -> list:
+        """
+        Turn (row_num, parsed) pairs into (row_num, parsed, fingerprint) triples
+
+        Each row is numbered among the identical rows before it in the whole
+        upload. Per base fingerprint, import_occurrences holds how many rows
+        were counted and the last of them (through_row), so memory stays
+        bounded by the batch. A batch replayed after an interruption starts
+        at the same row and finds its rows already counted, so it gets the
+        same numbers as the first time.
+        """
+        rows = [(row_num, parsed, fingerprint_document(self.user_id, parsed)) for row_num, parsed in batch]
+        rows_by_base = {}
+        for row_num, _, base in rows:
+            rows_by_base.setdefault(base, []).append(row_num)
+
+        cursor = self.db.import_occurrences.find(
+            {"import_id": self.import_id, "base": {"$in": list(rows_by_base)}},
+            {"_id": 0, "base": 1, "count": 1, "through_row": 1}
+        )
+        counters = {doc["base"]: doc async for doc in cursor}
+
+        now = datetime.utcnow()
+        next_occurrence = {}
+        # Most rows are the first of their kind: insert those counters, update the rest
+        created = []
+        updates = []
+        for base, row_nums in rows_by_base.items():
+            counter = counters.get(base)
+            if counter is None:
+                next_occurrence[base] = 0
+                created.append({
+                    "import_id": self.import_id,
+                    "base": base,
+                    "count": len(row_nums),
+                    "through_row": row_nums[-1],
+                    "created_at": now
+                })
+            elif counter["through_row"] >= row_nums[-1]:
+                next_occurrence[base] = counter["count"] - len(row_nums)
+            else:
+                next_occurrence[base] = counter["count"]
+                updates.append(UpdateOne(
+                    {"import_id": self.import_id, "base": base},
+                    {"$inc": {"count": len(row_nums)}, "$set": {"through_row": row_nums[-1]}}
+                ))
+        if created:
+            await self.db.import_occurrences.insert_many(created, ordered=False)
+        if updates:
+            await self.db.import_occurrences.bulk_write(updates, ordered=False)
+
+        numbered = []
+        for row_num, parsed, base in rows:
+            occurrence = next_occurrence[base]
+            next_occurrence[base] += 1
+            fingerprint = fingerprint_document(self.user_id, parsed, occurrence) if occurrence else base
+            numbered.append((row_num, parsed, fingerprint))
+        return numbered
+
+    async def _skip_duplicates(self, batch: list) -> list:
+        """Drop (row_num, parsed, fingerprint) triples the user already has stored"""
+        existing = await find_existing_fingerprints(self.db, self.user_id, {fp for _, _, fp in batch})
+
+        fresh = []
+        for row_num, parsed, fingerprint in batch:
+            if fingerprint in existing:
+                self.duplicate_count += 1
+                continue
+            existing.add(fingerprint)
+            fresh.append((row_num, parsed, fingerprint))
+        return fresh
+
+    async def _flush(self, batch: list):
+        """Categorize and insert one batch of (row_num, parsed) pairs"""
+        batch = await self._skip_duplicates(await self._fingerprint_batch(batch))
+
+        # Get AI categorization in batched, concurrent prompts
+        categorizations = await self.data_agent.categorize_transactions(
+            [parsed for _, parsed, _ in batch],
+            user_id=self.user_id
+        ) if batch else []
+
+        now = datetime.utcnow()
+        documents = [
+            {
+                **parsed,
+                "category": categorization["category"],
+                "confidence_score": categorization["confidence_score"],
+                "category_source": categorization["source"],
+                "fingerprint": fingerprint,
+                "user_id": self.user_id,
+                "created_at": now
+            }
+            for (_, parsed, fingerprint), categorization in zip(batch, categorizations)
+        ]
+
+        # Unordered so one bad row doesn't stop the rest
+        failed_indexes = set()
+        try:
+            if documents:
+                await self.db.transactions.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                index = write_error["index"]
+                failed_indexes.add(index)
+                if write_error.get("code") == DUPLICATE_KEY_ERROR:
+                    # Inserted concurrently (another import of the same rows)
+                    self.duplicate_count += 1
+                else:
+                    self._error(batch[index][0], write_error.get("errmsg", "Insert failed"))
+
+        inserted = [doc for index, doc in enumerate(documents) if index not in failed_indexes]
+        await apply_transactions(self.db, inserted)
+        self.transactions_added += len(inserted)
+        if inserted:
+            # Per batch: committed rows must invalidate ETags and cached insights even if
+            # the import later fails or is still running
+            await bump_data_version(self.db, self.user_id)
+
+        print(f"📥 CSV import: {self.transactions_added} transactions committed ({self.rows_read} rows read)")
+        if self.on_progress is not None:
+            await self.on_progress(self.progress())
@@ -0,0 +1,83 @@
+import hashlib
+import re
+from datetime import datetime
+from typing import Optional
+
+# Unlike the category cache key, digits are kept: reference numbers tell transactions apart
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+# Identical transactions a manual entry looks past for a free occurrence number
+MAX_OCCURRENCE_PROBE = 32
+
+
+def normalize_description(description: str) -> str:
+    """Lowercase alphanumeric words separated by single spaces"""
+    return _NON_ALNUM.sub(" ", description.lower()).strip()
+
+
+def transaction_fingerprint(
+    user_id: str,
+    date: datetime,
+    amount: float,
+    transaction_type: str,
+    description: str,
+    occurrence: int = 0
+) -> str:
+    """
+    Content hash identifying a transaction across imports
+
+    Built from the user, calendar day, amount (to the paisa), type and
+    normalized description, so the same statement line uploaded twice
+    hashes the same regardless of time of day, case or punctuation.
+
+    Args:
+        occurrence: How many identical transactions precede this one (in
+            its upload, or already recorded), so genuine repeats such as two
+            equal rides on one day hash differently while a re-upload
+            reproduces every hash. The first occurrence hashes without it.
+    """
+    parts = [
+        user_id,
+        date.strftime("%Y-%m-%d"),
+        f"{float(amount):.2f}",
+        transaction_type,
+        normalize_description(description),
+    ]
+    if occurrence:
+        parts.append(str(occurrence))
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=16).hexdigest()
+
+
+def fingerprint_document(user_id: str, transaction: dict, occurrence: int = 0) -> str:
+    """Fingerprint of a transaction dict with date, amount, type and description"""
+    return transaction_fingerprint(
+        user_id,
+        transaction["date"],
+        transaction["amount"],
+        transaction["type"],
+        transaction["description"],
+        occurrence
+    )
+
+
+async def find_existing_fingerprints(db, user_id: str, fingerprints: list) -> set:
+    """The subset of fingerprints the user already has transactions for"""
+    if not fingerprints:
+        return set()
+    cursor = db.transactions.find(
+        {"user_id": user_id, "fingerprint": {"$in": list(fingerprints)}},
+        {"_id": 0, "fingerprint": 1}
+    )
+    return {doc["fingerprint"] async for doc in cursor}
+
+
+async def next_free_fingerprint(db, user_id: str, transaction: dict) -> Optional[str]:
+    """
+    Fingerprint for recording one more of a transaction the user may already have
+
+    The lowest occurrence not yet stored, so entering the same purchase
+    twice by hand and later importing a statement listing it twice ends up
+    with two transactions. None if MAX_OCCURRENCE_PROBE are already taken.
+    """
+    candidates = [fingerprint_document(user_id, transaction, n) for n in range(MAX_OCCURRENCE_PROBE)]
+    existing = await find_existing_fingerprints(db, user_id, candidates)
+    return next((fingerprint for fingerprint in candidates if fingerprint not in existing), None)
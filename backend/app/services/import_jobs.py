@@ -0,0 +1,238 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from app.services.csv_import import CSVImport, CSV_READ_CHUNK_BYTES
+
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+# Uploads at least this large are imported in the background
+IMPORT_ASYNC_THRESHOLD_BYTES = int(os.getenv("IMPORT_ASYNC_THRESHOLD_BYTES", str(1024 * 1024)))
+# A running job whose worker has not checked in for this long is considered abandoned and resumed
+IMPORT_JOB_STALE_SECONDS = int(os.getenv("IMPORT_JOB_STALE_SECONDS", "60"))
+# How often a worker refreshes its running jobs' updated_at (well below the stale timeout)
+IMPORT_JOB_HEARTBEAT_SECONDS = float(os.getenv("IMPORT_JOB_HEARTBEAT_SECONDS", "15"))
+# How often each process looks for queued or abandoned jobs to pick up
+IMPORT_JOB_SWEEP_SECONDS = float(os.getenv("IMPORT_JOB_SWEEP_SECONDS", "30"))
+
+
+class ImportJobQueue:
+    """
+    Background CSV imports persisted in the import_jobs collection
+
+    Uploads are stored in GridFS (bucket import_files) and processed by a
+    small pool of asyncio workers. Progress is written after every batch,
+    so a job interrupted by a restart resumes after its last committed row.
+
+    Each process records itself as the owner of the jobs it runs and
+    heartbeats them. A periodic sweep picks up queued jobs and running jobs
+    whose owner stopped heartbeating (crashed or restarted), whenever that
+    happened.
+    """
+
+    def __init__(self, workers: int = IMPORT_WORKERS):
+        self.worker_count = workers
+        self.instance_id = uuid.uuid4().hex
+        self.db = None
+        self.data_agent = None
+        self._queue = None
+        self._queued = set()
+        self._running = set()
+        self._workers = []
+        self._tasks = []
+
+    async def start(self, db, data_agent):
+        """Start the workers and the sweep/heartbeat loops (the first sweep requeues unfinished jobs)"""
+        if self._workers:
+            return
+        self.db = db
+        self.data_agent = data_agent
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.worker_count)]
+        self._tasks = [asyncio.create_task(self._sweep_loop()), asyncio.create_task(self._heartbeat_loop())]
+
+    async def stop(self):
+        for task in self._workers + self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._tasks, return_exceptions=True)
+        self._workers = []
+        self._tasks = []
+        # Hand interrupted jobs back at once instead of waiting for them to go stale
+        try:
+            await self.db.import_jobs.update_many(
+                {"owner": self.instance_id, "status": "running"},
+                {"$set": {"status": "queued"}, "$unset": {"owner": ""}}
+            )
+        except Exception as e:
+            print(f"Error releasing import jobs: {str(e)}")
+        self._running.clear()
+        self._queued.clear()
+
+    async def _enqueue(self, job_id: ObjectId):
+        if job_id not in self._queued:
+            self._queued.add(job_id)
+            await self._queue.put(job_id)
+
+    async def sweep(self):
+        """Queue jobs that are waiting or were abandoned by their worker"""
+        try:
+            async for job in self.db.import_jobs.find(self._claimable(), {"_id": 1}):
+                await self._enqueue(job["_id"])
+        except Exception as e:
+            print(f"Error resuming import jobs: {str(e)}")
+
+    async def _sweep_loop(self):
+        while True:
+            await self.sweep()
+            await asyncio.sleep(IMPORT_JOB_SWEEP_SECONDS)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(IMPORT_JOB_HEARTBEAT_SECONDS)
+            if not self._running:
+                continue
+            try:
+                await self.db.import_jobs.update_many(
+                    {"_id": {"$in": list(self._running)}, "owner": self.instance_id, "status": "running"},
+                    {"$set": {"updated_at": datetime.utcnow()}}
+                )
+            except Exception as e:
+                print(f"Error updating import job heartbeats: {str(e)}")
+
+    def _bucket(self):
+        return AsyncIOMotorGridFSBucket(self.db, bucket_name="import_files")
+
+    def _claimable(self) -> dict:
+        stale_before = datetime.utcnow() - timedelta(seconds=IMPORT_JOB_STALE_SECONDS)
+        return {"$or": [
+            {"status": "queued"},
+            {"status": "running", "updated_at": {"$lt": stale_before}}
+        ]}
+
+    async def submit(self, upload, user_id: str) -> str:
+        """Store an upload and queue it; returns the job id"""
+        grid_in = self._bucket().open_upload_stream(upload.filename, metadata={"user_id": user_id})
+        while True:
+            chunk = await upload.read(CSV_READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            await grid_in.write(chunk)
+        await grid_in.close()
+
+        now = datetime.utcnow()
+        result = await self.db.import_jobs.insert_one({
+            "user_id": user_id,
+            "filename": upload.filename,
+            "file_id": grid_in._id,
+            "status": "queued",
+            "rows_read": 0,
+            "transactions_added": 0,
+            "duplicate_count": 0,
+            "error_count": 0,
+            "errors": [],
+            "created_at": now,
+            "updated_at": now
+        })
+        await self._enqueue(result.inserted_id)
+        return str(result.inserted_id)
+
+    async def get(self, job_id: str, user_id: str) -> Optional[dict]:
+        """Job status with throughput, or None if the user has no such job"""
+        job = await self.db.import_jobs.find_one(
+            {"_id": ObjectId(job_id), "user_id": user_id},
+            {"file_id": 0}
+        )
+        if job is None:
+            return None
+
+        job["_id"] = str(job["_id"])
+        job["rows_per_second"] = 0
+        if job.get("started_at"):
+            elapsed = ((job.get("finished_at") or datetime.utcnow()) - job["started_at"]).total_seconds()
+            if elapsed > 0:
+                job["rows_per_second"] = round(job["rows_read"] / elapsed, 2)
+        return job
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in import job {job_id}: {str(e)}")
+                await self._fail(job_id, e)
+            finally:
+                self._running.discard(job_id)
+                self._queue.task_done()
+
+    async def _fail(self, job_id: ObjectId, error: Exception):
+        """
+        Mark a job this process is running as failed and delete its upload
+
+        Never raises: the original error is often a MongoDB one, and an
+        exception here would end the worker. If the job cannot be updated it
+        stays running, stops heartbeating, and a sweep retries it once stale.
+        """
+        try:
+            job = await self.db.import_jobs.find_one_and_update(
+                {"_id": job_id, "owner": self.instance_id, "status": "running"},
+                {
+                    "$set": {"status": "failed", "failure": str(error), "finished_at": datetime.utcnow()},
+                    "$unset": {"file_id": ""}
+                },
+                projection={"file_id": 1}
+            )
+            if job is not None and job.get("file_id") is not None:
+                await self._bucket().delete(job["file_id"])
+        except Exception as e:
+            print(f"Error marking import job {job_id} failed: {str(e)}")
+
+    async def _run(self, job_id: ObjectId):
+        # Claim atomically so only one worker (or process) runs a job
+        now = datetime.utcnow()
+        job = await self.db.import_jobs.find_one_and_update(
+            {"_id": job_id, **self._claimable()},
+            {"$set": {"status": "running", "owner": self.instance_id, "updated_at": now}}
+        )
+        if job is None:
+            return
+        self._running.add(job_id)
+        if not job.get("started_at"):
+            await self.db.import_jobs.update_one({"_id": job_id}, {"$set": {"started_at": now}})
+
+        async def save_progress(progress: dict):
+            await self.db.import_jobs.update_one(
+                {"_id": job_id},
+                {"$set": {**progress, "updated_at": datetime.utcnow()}}
+            )
+
+        csv_import = CSVImport(
+            self.db,
+            self.data_agent,
+            job["user_id"],
+            on_progress=save_progress,
+            resume_from=job,
+            import_id=job_id
+        )
+        grid_out = await self._bucket().open_download_stream(job["file_id"])
+        result = await csv_import.run(grid_out)
+
+        await self.db.import_jobs.update_one(
+            {"_id": job_id},
+            {"$set": {
+                **csv_import.progress(),
+                "status": "completed",
+                "message": result["message"],
+                "finished_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
+            }}
+        )
+        await self._bucket().delete(job["file_id"])
+
+
+import_queue = ImportJobQueue()
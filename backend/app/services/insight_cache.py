@@ -0,0 +1,121 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Optional
+from app.metrics import registry
+from app.services.cache import TTLCache
+
+INSIGHT_CACHE_SIZE = int(os.getenv("INSIGHT_CACHE_SIZE", "1000"))
+INSIGHT_CACHE_TTL_SECONDS = float(os.getenv("INSIGHT_CACHE_TTL_SECONDS", "86400"))
+INSIGHTS_STALE_WHILE_REVALIDATE = os.getenv("INSIGHTS_STALE_WHILE_REVALIDATE", "true").lower() == "true"
+
+insight_cache_requests = registry.counter("insight_cache_requests_total", "Insight cache lookups by result")
+
+
+def insight_cache_key(user_id: str, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> str:
+    start = start_date.isoformat() if start_date else ""
+    end = end_date.isoformat() if end_date else ""
+    return f"{user_id}:{start}:{end}"
+
+
+class InsightCache:
+    """
+    Generated insight payloads per user and date window, tagged with the
+    data version they were computed from
+
+    Entries live in process memory and in the insight_cache collection, so
+    warm and cold workers share them. An entry is fresh while its version
+    matches the user's current data version. Fallback payloads (the AI was
+    unavailable) are never stored, so the next request tries the model again.
+    """
+
+    def __init__(self):
+        self.memory = TTLCache(max_size=INSIGHT_CACHE_SIZE, ttl_seconds=INSIGHT_CACHE_TTL_SECONDS)
+        self._refreshing = {}
+
+    async def get(self, db, key: str, user_id: str) -> Optional[dict]:
+        """Return {"version", "payload"} for a key, or None"""
+        entry = self.memory.get(key)
+        if entry is None and db is not None:
+            doc = await db.insight_cache.find_one({"_id": key, "user_id": user_id})
+            if doc is not None:
+                entry = {"version": doc["version"], "payload": doc["payload"]}
+                self.memory.set(key, entry)
+        return entry
+
+    async def set(self, db, key: str, user_id: str, version: int, payload: dict):
+        if payload.get("fallback"):
+            return
+        entry = {"version": version, "payload": payload}
+        self.memory.set(key, entry)
+        if db is not None:
+            try:
+                await db.insight_cache.replace_one(
+                    {"_id": key, "user_id": user_id},
+                    {**entry, "user_id": user_id, "updated_at": datetime.utcnow()},
+                    upsert=True
+                )
+            except Exception as e:
+                print(f"Error writing insight cache: {str(e)}")
+
+    async def delete(self, db, key: str, user_id: str):
+        self.memory.delete(key)
+        if db is not None:
+            await db.insight_cache.delete_one({"_id": key, "user_id": user_id})
+
+    async def get_or_compute(
+        self,
+        db,
+        key: str,
+        user_id: str,
+        version: int,
+        compute,
+        allow_stale: bool = INSIGHTS_STALE_WHILE_REVALIDATE
+    ) -> tuple:
+        """
+        Return a cached payload for the current version, computing it on a miss
+
+        With allow_stale, an entry from an older version is returned
+        immediately while a single background task recomputes it.
+
+        Args:
+            compute: Coroutine function producing the payload dict
+
+        Returns:
+            (payload, fresh) where fresh is False for a stale entry or a
+            fallback payload, neither of which belongs to the current version
+        """
+        entry = await self.get(db, key, user_id)
+        if entry is not None and entry["version"] == version:
+            insight_cache_requests.inc(result="hit")
+            return entry["payload"], True
+
+        if entry is not None and allow_stale:
+            insight_cache_requests.inc(result="stale")
+            self._refresh_in_background(db, key, user_id, version, compute)
+            return entry["payload"], False
+
+        insight_cache_requests.inc(result="miss")
+        payload = await compute()
+        await self.set(db, key, user_id, version, payload)
+        return payload, not payload.get("fallback")
+
+    def _refresh_in_background(self, db, key: str, user_id: str, version: int, compute):
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                payload = await compute()
+                await self.set(db, key, user_id, version, payload)
+            except Exception as e:
+                # e.g. every transaction was deleted: stop serving the stale entry
+                print(f"Error refreshing insights: {str(e)}")
+                await self.delete(db, key, user_id)
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+
+insight_cache = InsightCache()
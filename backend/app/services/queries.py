@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+# Field projections per use case, so only the fields a caller reads cross the wire
+TRANSACTION_LIST_PROJECTION = {
+    "date": 1, "amount": 1, "type": 1, "description": 1, "category": 1, "confidence_score": 1
+}
+# Fields needed to update rollups and the category cache when a transaction changes
+TRANSACTION_ROLLUP_PROJECTION = {
+    "user_id": 1, "date": 1, "amount": 1, "type": 1, "category": 1, "description": 1
+}
+GOAL_LIST_PROJECTION = {
+    "title": 1, "target_amount": 1, "target_date": 1, "current_amount": 1, "status": 1, "created_at": 1
+}
+GOAL_COACHING_PROJECTION = {"_id": 0, "target_amount": 1, "target_date": 1}
+
+
+@dataclass(slots=True)
+class TransactionRecord:
+    id: str
+    date: datetime
+    amount: float
+    type: str
+    description: str
+    category: Optional[str] = None
+    confidence_score: Optional[float] = None
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "TransactionRecord":
+        return cls(
+            id=str(doc["_id"]),
+            date=doc["date"],
+            amount=doc["amount"],
+            type=doc["type"],
+            description=doc["description"],
+            category=doc.get("category"),
+            confidence_score=doc.get("confidence_score")
+        )
+
+    def to_dict(self) -> dict:
+        """API representation (id exposed as _id)"""
+        return {
+            "_id": self.id,
+            "date": self.date,
+            "amount": self.amount,
+            "type": self.type,
+            "description": self.description,
+            "category": self.category,
+            "confidence_score": self.confidence_score
+        }
+
+
+@dataclass(slots=True)
+class GoalRecord:
+    id: str
+    title: str
+    target_amount: float
+    target_date: datetime
+    current_amount: float = 0.0
+    status: str = "active"
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "GoalRecord":
+        return cls(
+            id=str(doc["_id"]),
+            title=doc["title"],
+            target_amount=doc["target_amount"],
+            target_date=doc["target_date"],
+            current_amount=doc.get("current_amount", 0.0),
+            status=doc.get("status", "active"),
+            created_at=doc.get("created_at")
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "_id": self.id,
+            "title": self.title,
+            "target_amount": self.target_amount,
+            "target_date": self.target_date,
+            "current_amount": self.current_amount,
+            "status": self.status,
+            "created_at": self.created_at
+        }
+
+
+async def find_transactions(db, query: dict, sort: list, limit: int, skip: int = 0) -> list:
+    """Transaction listing as TransactionRecord objects"""
+    cursor = db.transactions.find(query, TRANSACTION_LIST_PROJECTION).sort(sort)
+    if skip:
+        cursor = cursor.skip(skip)
+    return [TransactionRecord.from_doc(doc) async for doc in cursor.limit(limit)]
+
+
+async def find_goals(db, user_id: str, limit: int = 100) -> list:
+    """A user's goals, newest first, as GoalRecord objects"""
+    cursor = db.goals.find({"user_id": user_id}, GOAL_LIST_PROJECTION).sort("created_at", -1).limit(limit)
+    return [GoalRecord.from_doc(doc) async for doc in cursor]
+
+
+async def find_coaching_goals(db, user_id: str, limit: int = 10) -> list:
+    """Active goals with only the fields the coaching prompt reads"""
+    cursor = db.goals.find({"user_id": user_id, "status": "active"}, GOAL_COACHING_PROJECTION).limit(limit)
+    return await cursor.to_list(length=limit)
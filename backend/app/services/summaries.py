@@ -0,0 +1,240 @@
+from datetime import datetime, timezone
+from typing import Optional
+from pymongo import UpdateOne
+from app.services.analytics import build_analysis
+from app.services.versions import get_data_version
+
+# Bucket granularities kept in user_summaries, with their key formats
+GRANULARITIES = {"day": "%Y-%m-%d", "month": "%Y-%m"}
+ALL_TIME = "all"
+
+
+def summary_id(user_id: str, granularity: str, bucket: str) -> str:
+    return f"{user_id}:{granularity}:{bucket}"
+
+
+def _category_field(category: Optional[str]) -> str:
+    """Category name usable as a document field (no dots or leading $)"""
+    return (category or "Uncategorized").replace(".", "_").replace("$", "_")
+
+
+def to_utc(value: datetime) -> datetime:
+    """Naive UTC datetime, as MongoDB stores dates; naive values are taken to be UTC already"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _buckets(date: datetime) -> list:
+    date = to_utc(date)
+    return [(granularity, date.strftime(fmt)) for granularity, fmt in GRANULARITIES.items()] + [(ALL_TIME, ALL_TIME)]
+
+
+def _add(fields: dict, name: str, value: float):
+    fields[name] = fields.get(name, 0) + value
+
+
+def _bucket_increments(transactions: list, sign: int) -> dict:
+    """Pre-aggregate $inc deltas per (user, granularity, bucket)"""
+    increments = {}
+    for txn in transactions:
+        amount = txn.get("amount", 0)
+        is_income = txn.get("type") == "income"
+        prefix = "income" if is_income else "expense"
+        for granularity, bucket in _buckets(txn["date"]):
+            fields = increments.setdefault((txn["user_id"], granularity, bucket), {})
+            _add(fields, f"{prefix}_total", sign * amount)
+            _add(fields, f"{prefix}_count", sign)
+            _add(fields, f"{prefix}_by_category.{_category_field(txn.get('category'))}", sign * amount)
+            if is_income:
+                # Running sum of squares lets volatility be derived without a rescan
+                _add(fields, "income_sum_sq", sign * amount * amount)
+    return increments
+
+
+async def apply_transactions(db, transactions: list, sign: int = 1):
+    """
+    Add (sign=1) or remove (sign=-1) transactions from the user_summaries rollups
+
+    Each touched daily, monthly and all-time bucket gets one atomic $inc.
+    Filters carry user_id so each upsert is routed to the user's shard.
+    """
+    if not transactions:
+        return
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"_id": summary_id(user_id, granularity, bucket), "user_id": user_id},
+            {
+                "$inc": fields,
+                "$set": {"updated_at": now},
+                "$setOnInsert": {"granularity": granularity, "bucket": bucket}
+            },
+            upsert=True
+        )
+        for (user_id, granularity, bucket), fields in _bucket_increments(transactions, sign).items()
+    ]
+    try:
+        await db.user_summaries.bulk_write(operations, ordered=False)
+    except Exception as e:
+        # Rollups can always be rebuilt from transactions; never fail the write path
+        print(f"Error updating user summaries: {str(e)}")
+        for user_id in {txn["user_id"] for txn in transactions}:
+            await invalidate_user_summary(db, user_id)
+
+
+async def invalidate_user_summary(db, user_id: str):
+    """Mark a user's rollups as untrusted so the next read rebuilds them from transactions"""
+    try:
+        await db.user_summaries.update_one(
+            {"_id": summary_id(user_id, ALL_TIME, ALL_TIME), "user_id": user_id},
+            {"$unset": {"backfilled": ""}}
+        )
+    except Exception as e:
+        print(f"Error invalidating user summary: {str(e)}")
+
+
+async def rebuild_user_summary(db, user_id: str):
+    """
+    Recompute a user's rollups from scratch (backfill for pre-existing transactions)
+
+    The replacement is not atomic, so the all-time document, whose
+    backfilled flag makes the rollups readable, is written last and only
+    flagged when no write changed the user's data meanwhile. If anything
+    fails, the rollups are left unflagged and the next read rebuilds them.
+    """
+    version = await get_data_version(db, user_id)
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$group": {
+            "_id": {
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}},
+                "income": {"$eq": ["$type", "income"]},
+                "category": {"$ifNull": ["$category", "Uncategorized"]}
+            },
+            "total": {"$sum": "$amount"},
+            "count": {"$sum": 1},
+            "sum_sq": {"$sum": {"$multiply": ["$amount", "$amount"]}}
+        }}
+    ]
+
+    documents = {}
+    async for group in db.transactions.aggregate(pipeline):
+        day = group["_id"]["day"]
+        prefix = "income" if group["_id"]["income"] else "expense"
+        for granularity, bucket in [("day", day), ("month", day[:7]), (ALL_TIME, ALL_TIME)]:
+            doc = documents.setdefault((granularity, bucket), {
+                "_id": summary_id(user_id, granularity, bucket),
+                "user_id": user_id,
+                "granularity": granularity,
+                "bucket": bucket,
+                "income_by_category": {},
+                "expense_by_category": {}
+            })
+            _add(doc, f"{prefix}_total", group["total"])
+            _add(doc, f"{prefix}_count", group["count"])
+            _add(doc[f"{prefix}_by_category"], _category_field(group["_id"]["category"]), group["total"])
+            if prefix == "income":
+                _add(doc, "income_sum_sq", group["sum_sq"])
+
+    now = datetime.utcnow()
+    for doc in documents.values():
+        doc["updated_at"] = now
+    all_time = documents.pop((ALL_TIME, ALL_TIME), None)
+
+    try:
+        await db.user_summaries.delete_many({"user_id": user_id})
+        if documents:
+            await db.user_summaries.insert_many(list(documents.values()), ordered=False)
+        if all_time is not None:
+            all_time["backfilled"] = await get_data_version(db, user_id) == version
+            await db.user_summaries.insert_one(all_time)
+    except Exception as e:
+        print(f"Error rebuilding user summary: {str(e)}")
+        await invalidate_user_summary(db, user_id)
+
+
+def _merge_buckets(buckets: list) -> dict:
+    merged = {"income_by_category": {}, "expense_by_category": {}}
+    for doc in buckets:
+        for field in ("income_total", "income_count", "income_sum_sq", "expense_total", "expense_count"):
+            _add(merged, field, doc.get(field, 0))
+        for field in ("income_by_category", "expense_by_category"):
+            for category, amount in doc.get(field, {}).items():
+                _add(merged[field], category, amount)
+    return merged
+
+
+def _summary_to_analysis(summary: dict) -> Optional[dict]:
+    income_count = summary.get("income_count", 0)
+    expense_count = summary.get("expense_count", 0)
+    if income_count + expense_count <= 0:
+        return None
+
+    # Drop categories emptied by deletes (leftover float noise)
+    income_by_category = {k: v for k, v in summary.get("income_by_category", {}).items() if abs(v) > 1e-9}
+    expense_by_category = {k: v for k, v in summary.get("expense_by_category", {}).items() if abs(v) > 1e-9}
+
+    volatility = 0
+    if income_count > 1:
+        mean = summary.get("income_total", 0) / income_count
+        variance = max(summary.get("income_sum_sq", 0) / income_count - mean ** 2, 0)
+        volatility = (variance ** 0.5 / mean * 100) if mean > 0 else 0
+
+    return build_analysis(income_by_category, expense_by_category, income_count, expense_count, volatility)
+
+
+def covers_window(start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> bool:
+    """
+    Whether daily buckets can answer [start_date, end_date) exactly
+
+    Buckets are UTC days, so both bounds must fall on midnight UTC; midnight
+    in another timezone is partway through a UTC day.
+    """
+    return all(
+        bound is None or to_utc(bound).time() == datetime.min.time()
+        for bound in (start_date, end_date)
+    )
+
+
+async def summary_analysis(
+    db,
+    user_id: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Optional[dict]:
+    """
+    Read the analysis from precomputed rollups
+
+    Without a window this is a single document read; with a window the
+    daily buckets in [start_date, end_date) are merged, so both bounds must
+    fall on midnight UTC (see covers_window).
+
+    Returns:
+        analysis dict, or None when the rollups are missing or the window is empty
+    """
+    if not covers_window(start_date, end_date):
+        raise ValueError("Rollups only answer windows bounded at midnight UTC")
+    all_time = await db.user_summaries.find_one({"_id": summary_id(user_id, ALL_TIME, ALL_TIME), "user_id": user_id})
+    if all_time is None or not all_time.get("backfilled"):
+        return None
+
+    if not start_date and not end_date:
+        return _summary_to_analysis(all_time)
+
+    query = {"user_id": user_id, "granularity": "day", "bucket": {}}
+    if start_date:
+        query["bucket"]["$gte"] = to_utc(start_date).strftime(GRANULARITIES["day"])
+    if end_date:
+        query["bucket"]["$lt"] = to_utc(end_date).strftime(GRANULARITIES["day"])
+    buckets = await db.user_summaries.find(query).to_list(length=None)
+    return _summary_to_analysis(_merge_buckets(buckets))
+
+
+async def get_buckets(db, user_id: str, granularity: str = "month", limit: int = 12) -> list:
+    """Most recent rollup buckets of a granularity, newest first"""
+    cursor = db.user_summaries.find(
+        {"user_id": user_id, "granularity": granularity},
+        {"_id": 0, "user_id": 0}
+    ).sort("bucket", -1).limit(limit)
+    return await cursor.to_list(length=limit)
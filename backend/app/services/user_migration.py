@@ -0,0 +1,109 @@
+"""
+Move one user's data to another user id
+
+Used to hand the single-tenant data (DEFAULT_USER_ID) to a real account
+once authentication is enabled:
+
+    python -m app.services.user_migration default_user <user_id>
+
+Documents are moved one at a time with their user_id in the filter,
+which sharded clusters require when a shard key value changes (the
+client's retryable writes cover this). Transactions that would collide
+with ones the target user already has are left with the old user and
+counted as conflicts.
+"""
+
+import asyncio
+import sys
+from collections import Counter
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.services.fingerprints import fingerprint_document
+from app.services.summaries import rebuild_user_summary
+from app.services.versions import bump_data_version
+
+MIGRATION_BATCH_SIZE = 1000
+# Collections whose documents belong to one user through their user_id field
+USER_OWNED_COLLECTIONS = ["goals", "import_jobs"]
+
+
+async def _write(collection, operations: list) -> int:
+    """Apply moves unordered; returns how many failed"""
+    if not operations:
+        return 0
+    try:
+        await collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        return len(e.details.get("writeErrors", []))
+    return 0
+
+
+async def migrate_user_data(db, from_user_id: str, to_user_id: str) -> dict:
+    """
+    Reassign every document of from_user_id to to_user_id
+
+    Transaction fingerprints include the user, so they are recomputed,
+    numbering identical transactions in date order as an import would.
+    Rollups are rebuilt and both users' data versions bumped, which also
+    retires their cached insights.
+
+    Returns:
+        counts of moved documents per collection, plus transaction conflicts
+    """
+    if from_user_id == to_user_id:
+        raise ValueError("Source and target user are the same")
+    result = {}
+
+    for name in USER_OWNED_COLLECTIONS:
+        operations = [
+            UpdateOne({"_id": doc["_id"], "user_id": from_user_id}, {"$set": {"user_id": to_user_id}})
+            async for doc in db[name].find({"user_id": from_user_id}, {"_id": 1})
+        ]
+        failed = await _write(db[name], operations)
+        result[name] = len(operations) - failed
+
+    occurrences = Counter()
+    operations = []
+    moved = conflicts = 0
+    cursor = db.transactions.find(
+        {"user_id": from_user_id},
+        {"date": 1, "amount": 1, "type": 1, "description": 1, "fingerprint": 1}
+    ).sort([("date", 1), ("_id", 1)])
+    async for txn in cursor:
+        update = {"user_id": to_user_id}
+        if "fingerprint" in txn:
+            base = fingerprint_document(to_user_id, txn)
+            update["fingerprint"] = fingerprint_document(to_user_id, txn, occurrences[base])
+            occurrences[base] += 1
+        operations.append(UpdateOne({"_id": txn["_id"], "user_id": from_user_id}, {"$set": update}))
+        if len(operations) >= MIGRATION_BATCH_SIZE:
+            failed = await _write(db.transactions, operations)
+            moved += len(operations) - failed
+            conflicts += failed
+            operations = []
+    failed = await _write(db.transactions, operations)
+    result["transactions"] = moved + len(operations) - failed
+    result["conflicts"] = conflicts + failed
+
+    await db.insight_cache.delete_many({"user_id": from_user_id})
+    for user_id in (from_user_id, to_user_id):
+        await rebuild_user_summary(db, user_id)
+        await bump_data_version(db, user_id)
+    return result
+
+
+async def _main(from_user_id: str, to_user_id: str):
+    from app.database import connect_to_mongo, close_mongo_connection, get_database
+
+    await connect_to_mongo()
+    try:
+        result = await migrate_user_data(get_database(), from_user_id, to_user_id)
+        print(f"✅ Moved {from_user_id} to {to_user_id}: {result}")
+    finally:
+        await close_mongo_connection(force=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m app.services.user_migration <from_user_id> <to_user_id>")
+    asyncio.run(_main(sys.argv[1], sys.argv[2]))
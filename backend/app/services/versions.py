@@ -0,0 +1,51 @@
+import hashlib
+from fastapi import Response
+from pymongo import ReturnDocument
+
+# Browsers may keep responses but must revalidate them with the ETag
+ETAG_CACHE_CONTROL = "private, no-cache"
+
+
+async def bump_data_version(db, user_id: str) -> int:
+    """Record that a user's transactions or goals changed; returns the new version"""
+    doc = await db.data_versions.find_one_and_update(
+        {"_id": user_id},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+
+async def get_data_version(db, user_id: str) -> int:
+    """Current data version for a user (0 if nothing has been written yet)"""
+    doc = await db.data_versions.find_one({"_id": user_id})
+    return doc["version"] if doc else 0
+
+
+def data_etag(request, user_id: str, version: int) -> str:
+    """Weak ETag for a read endpoint: the user's data version plus the request URL"""
+    url = f"{request.url.path}?{request.url.query}"
+    digest = hashlib.blake2s(url.encode(), digest_size=8).hexdigest()
+    return f'W/"{user_id}-{version}-{digest}"'
+
+
+def etag_matches(request, etag: str) -> bool:
+    """Whether If-None-Match already names this ETag (weak comparison)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL})
+
+
+def with_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = ETAG_CACHE_CONTROL
+    return response
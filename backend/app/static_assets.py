@@ -0,0 +1,119 @@
+import gzip
+import mimetypes
+import os
+from pathlib import Path
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from app.middleware import brotli, choose_encoding
+
+# Hashed build output: safe to cache forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+STATIC_CACHE_CONTROL = os.getenv("STATIC_CACHE_CONTROL", "public, max-age=3600")
+INDEX_CACHE_CONTROL = "no-cache"
+
+# Hashed build output lives under this prefix
+ASSETS_PREFIX = "assets/"
+
+COMPRESSIBLE_SUFFIXES = {".js", ".css", ".html", ".svg", ".json", ".txt", ".map", ".xml", ".ico"}
+STATIC_PRECOMPRESS = os.getenv("STATIC_PRECOMPRESS", "true").lower() == "true"
+SIBLING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+class StaticAsset:
+    __slots__ = ("path", "stat", "media_type", "cache_control", "variants")
+
+    def __init__(self, path: Path, cache_control: str):
+        self.path = path
+        self.stat = path.stat()
+        self.media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        self.cache_control = cache_control
+        # encoding -> (sibling path, stat)
+        self.variants = {}
+
+
+class StaticAssets:
+    """
+    Frontend build (frontend/dist) indexed once at startup
+
+    Requests are answered from the in-memory index without touching the
+    filesystem for lookups. Precompressed .br/.gz siblings are served when
+    the client accepts them (and created at startup if missing), hashed
+    /assets/* files are cached as immutable, and index.html is kept in
+    memory in every encoding.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.assets = {}
+        self.index = {}
+        self._scan()
+
+    def _scan(self):
+        for path in sorted(self.root.rglob("*")):
+            if not path.is_file() or path.suffix in (".br", ".gz"):
+                continue
+            relative = path.relative_to(self.root).as_posix()
+            cache_control = IMMUTABLE_CACHE_CONTROL if relative.startswith(ASSETS_PREFIX) else STATIC_CACHE_CONTROL
+            asset = StaticAsset(path, cache_control)
+            if path.suffix in COMPRESSIBLE_SUFFIXES:
+                self._index_variants(asset)
+            self.assets[relative] = asset
+
+        index_path = self.root / "index.html"
+        if index_path.is_file():
+            content = index_path.read_bytes()
+            self.index = {None: content, "gzip": gzip.compress(content, compresslevel=9)}
+            if brotli is not None:
+                self.index["br"] = brotli.compress(content)
+
+    def _index_variants(self, asset: StaticAsset):
+        for encoding, suffix in SIBLING_SUFFIXES.items():
+            if encoding == "br" and brotli is None:
+                continue
+            sibling = asset.path.with_name(asset.path.name + suffix)
+            if not sibling.is_file() and STATIC_PRECOMPRESS:
+                try:
+                    data = asset.path.read_bytes()
+                    compressed = brotli.compress(data) if encoding == "br" else gzip.compress(data, compresslevel=9)
+                    if len(compressed) >= len(data):
+                        continue
+                    sibling.write_bytes(compressed)
+                except OSError as e:
+                    # Read-only deploys: serve the uncompressed file
+                    print(f"⚠️  Could not precompress {asset.path.name}: {str(e)}")
+                    continue
+            if sibling.is_file():
+                asset.variants[encoding] = (sibling, sibling.stat())
+
+    def response(self, full_path: str, request_headers: Headers) -> Response:
+        """
+        Response for a frontend path
+
+        Unknown paths get index.html (client-side routing), except under
+        assets/: a stale client asking for a chunk from an older build gets
+        a 404 rather than HTML served as its script.
+        """
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        asset = self.assets.get(full_path)
+
+        if asset is None and full_path.startswith(ASSETS_PREFIX):
+            return Response("Not Found", status_code=404, media_type="text/plain", headers={"Cache-Control": INDEX_CACHE_CONTROL})
+        if asset is None or full_path == "index.html":
+            return self._index_response(encoding)
+
+        headers = {"Cache-Control": asset.cache_control}
+        if asset.variants:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding in asset.variants:
+            sibling, stat = asset.variants[encoding]
+            headers["Content-Encoding"] = encoding
+            return FileResponse(sibling, stat_result=stat, media_type=asset.media_type, headers=headers)
+        return FileResponse(asset.path, stat_result=asset.stat, media_type=asset.media_type, headers=headers)
+
+    def _index_response(self, encoding) -> Response:
+        headers = {"Cache-Control": INDEX_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        # The uncompressed copy is keyed by None, which is not an encoding to send
+        if encoding is not None and encoding in self.index:
+            headers["Content-Encoding"] = encoding
+            return Response(self.index[encoding], media_type="text/html", headers=headers)
+        return Response(self.index.get(None, b""), media_type="text/html", headers=headers)
@@ -0,0 +1,89 @@
+import base64
+import hashlib
+import hmac
+import os
+import re
+import sys
+import time
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+
+load_dotenv()
+
+# Signs access tokens; without it the API is single-tenant and every request acts as DEFAULT_USER_ID
+AUTH_SECRET = os.getenv("AUTH_SECRET", "")
+AUTH_TOKEN_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", str(30 * 86400)))
+DEFAULT_USER_ID = os.getenv("DEFAULT_USER_ID", "default_user")
+
+# Ids end up in Mongo _id prefixes, cache keys and ETags, so keep them plain
+_VALID_USER_ID = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(body: str, secret: str) -> str:
+    return _b64encode(hmac.new(secret.encode(), body.encode(), hashlib.sha256).digest())
+
+
+def issue_token(user_id: str, ttl_seconds: int = AUTH_TOKEN_TTL_SECONDS, secret: str = None) -> str:
+    """Signed access token naming user_id, valid for ttl_seconds"""
+    secret = secret or AUTH_SECRET
+    if not secret:
+        raise ValueError("AUTH_SECRET is not set")
+    if not _VALID_USER_ID.match(user_id):
+        raise ValueError("Invalid user id")
+    body = _b64encode(f"{user_id}:{int(time.time()) + ttl_seconds}".encode())
+    return f"{body}.{_sign(body, secret)}"
+
+
+def verify_token(token: str, secret: str = None) -> Optional[str]:
+    """The user id of a valid, unexpired token, else None"""
+    secret = secret or AUTH_SECRET
+    body, _, signature = token.partition(".")
+    if not secret or not signature or not hmac.compare_digest(signature, _sign(body, secret)):
+        return None
+    try:
+        user_id, expires = _b64decode(body).decode().rsplit(":", 1)
+        if int(expires) < time.time():
+            return None
+    except ValueError:
+        return None
+    return user_id if _VALID_USER_ID.match(user_id) else None
+
+
+def get_user_id(request: Request) -> str:
+    """
+    FastAPI dependency resolving the user a request acts for
+
+    The id comes only from a verified token: "Authorization: Bearer <token>",
+    or the access_token query parameter for clients that cannot set headers
+    (EventSource). Without AUTH_SECRET there is a single tenant and every
+    request acts as DEFAULT_USER_ID.
+    """
+    if not AUTH_SECRET:
+        return DEFAULT_USER_ID
+
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        token = request.query_params.get("access_token", "")
+    if not token:
+        raise HTTPException(status_code=401, detail="Missing access token", headers={"WWW-Authenticate": "Bearer"})
+
+    user_id = verify_token(token.strip())
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired access token", headers={"WWW-Authenticate": "Bearer"})
+    return user_id
+
+
+if __name__ == "__main__":
+    # Issue a token for a user: python -m app.users <user_id> [ttl_seconds]
+    if len(sys.argv) not in (2, 3):
+        sys.exit("usage: python -m app.users <user_id> [ttl_seconds]")
+    print(issue_token(sys.argv[1], int(sys.argv[2]) if len(sys.argv) == 3 else AUTH_TOKEN_TTL_SECONDS))
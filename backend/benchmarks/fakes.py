@@ -0,0 +1,120 @@
+"""
+Local stand-ins for Gemini and MongoDB used by the load benchmarks
+
+FakeGeminiModel replaces the SDK model inside the real LLMClient, so calls
+still go through the thread pool, semaphore and timeout; only the network
+round trip is simulated (a blocking sleep, like the real SDK call).
+"""
+
+import json
+import os
+import random
+import re
+import time
+from types import SimpleNamespace
+
+# Batch rows are serialized as [id,"description",amount,"type"]
+ITEM_ID_PATTERN = re.compile(r'\[(\d+),"')
+
+
+class FakeGeminiError(Exception):
+    """Injected model failure"""
+
+
+class FakeGeminiModel:
+    """
+    Answers categorization and coaching prompts after a configurable delay
+
+    Args:
+        latency: Mean seconds per call
+        jitter: Uniform +/- seconds added to the latency
+        error_rate: Fraction of calls that raise instead of answering
+        seed: Seed for the jitter/error random stream
+    """
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.1, error_rate: float = 0.0, seed: int = 7):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        self.calls += 1
+        if stream:
+            return self._stream(prompt)
+        time.sleep(max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter)))
+        if self._random.random() < self.error_rate:
+            raise FakeGeminiError("injected failure")
+        return SimpleNamespace(text=self._answer(prompt), usage_metadata=None)
+
+    def _stream(self, prompt: str):
+        """Chunks of the answer, one line at a time, spread over the latency"""
+        lines = self._answer(prompt).splitlines(keepends=True)
+        for line in lines:
+            time.sleep(max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter)) / len(lines))
+            if self._random.random() < self.error_rate:
+                raise FakeGeminiError("injected failure")
+            yield SimpleNamespace(text=line)
+
+    def _answer(self, prompt: str) -> str:
+        if "RECOMMENDATION:" in prompt:
+            return (
+                "INSIGHT: Your income varies week to week.\n"
+                "INSIGHT: Food is your largest expense.\n"
+                "RECOMMENDATION: Set aside 20% of each payout.\n"
+                "RECOMMENDATION: Cap food delivery spending.\n"
+            )
+        if "JSON array" in prompt:
+            ids = [int(match) for match in ITEM_ID_PATTERN.findall(prompt)]
+            return json.dumps([
+                {"id": item_id, "category": "Other Expense", "confidence_score": 0.8}
+                for item_id in ids
+            ])
+        if "recommendations" in prompt:
+            return json.dumps({
+                "insights": ["Your income varies week to week.", "Food is your largest expense."],
+                "recommendations": ["Set aside 20% of each payout.", "Cap food delivery spending."]
+            })
+        return json.dumps({"category": "Other Expense", "confidence_score": 0.8, "reasoning": "benchmark"})
+
+
+def install_fake_llm(model: FakeGeminiModel):
+    """Make the process-wide LLM client use the fake model (call before importing the app)"""
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    from app.agents import llm_client
+
+    client = llm_client.get_llm_client()
+    client.model = model
+    return client
+
+
+async def install_database(mongodb_uri: str = None, db_name: str = "finwise_benchmark"):
+    """
+    Point app.database at a benchmark database on the running event loop
+
+    Uses mongomock (in-memory) unless a MongoDB URI is given. The app's own
+    connect_to_mongo then reuses this client and creates the indexes. Call
+    before importing the app, since some settings are read at import time.
+    """
+    import asyncio
+    from app import database
+
+    if mongodb_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(mongodb_uri, **database.client_options())
+        await client.drop_database(db_name)
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("mongomock-motor is required for the in-memory database: pip install mongomock-motor")
+        client = AsyncMongoMockClient()
+        # GridFS needs a real server, so uploads of any size are imported inline
+        os.environ.setdefault("IMPORT_ASYNC_THRESHOLD_BYTES", str(2 ** 62))
+
+    os.environ["MONGODB_DB_NAME"] = db_name
+    database.db.client = client
+    database.db.loop = asyncio.get_running_loop()
+    database.db.db = client[db_name]
+    return database.db.db
@@ -0,0 +1,308 @@
+"""
+Load benchmarks for the hot API paths
+
+Runs scripted scenarios against the real FastAPI app in-process (httpx over
+ASGI), with Gemini replaced by FakeGeminiModel and MongoDB by mongomock
+unless --mongodb-uri points at a real (throwaway) server. Each scenario
+reports throughput and p50/p95/p99 latency.
+
+Scenarios:
+    create             single POST /api/transactions/
+    bulk_csv           POST /api/transactions/bulk with a --scale row CSV
+                       (background imports are polled until they finish)
+    listing            cursor-paginated GET /api/transactions/
+    insights_uncached  GET /api/insights/ after every data change
+    insights_cached    GET /api/insights/ with an unchanged data version
+
+Run from the backend directory:
+    python -m benchmarks.load --scale 1k
+    python -m benchmarks.load --scale 100k --scenarios listing,insights_cached
+    python -m benchmarks.load --save baseline.json
+    python -m benchmarks.load --compare baseline.json
+
+mongomock runs queries on the event loop, so absolute numbers are only
+comparable between runs of the same setup; use --mongodb-uri for numbers
+closer to production.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from benchmarks.data import SCALES, generate_transactions, seed_transactions, write_csv
+from benchmarks.fakes import FakeGeminiModel, install_database, install_fake_llm
+from app.users import DEFAULT_USER_ID
+
+SCENARIOS = ["create", "bulk_csv", "listing", "insights_uncached", "insights_cached"]
+# Scenarios that read the seeded transactions
+SEEDED_SCENARIOS = {"listing", "insights_uncached", "insights_cached"}
+USER_ID = DEFAULT_USER_ID
+LISTING_PAGE_SIZE = 50
+IMPORT_POLL_SECONDS = 0.2
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(name: str, latencies: list, errors: int, elapsed: float, items: int = None) -> dict:
+    """
+    Scenario summary
+
+    Args:
+        items: Units of work for the throughput figure (defaults to the
+            request count; bulk_csv uses rows)
+    """
+    latencies = sorted(latencies)
+    items = len(latencies) + errors if items is None else items
+    return {
+        "scenario": name,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput": round(items / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def run_requests(total: int, concurrency: int, send, prepare=None) -> tuple:
+    """
+    Issue total requests from concurrency workers
+
+    Args:
+        send: Coroutine function (index) -> response; only this is timed
+        prepare: Optional coroutine function (index) run before each request
+
+    Returns:
+        (latencies, errors, elapsed seconds)
+    """
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            if prepare is not None:
+                await prepare(index)
+            started = time.perf_counter()
+            try:
+                response = await send(index)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(max(1, concurrency))])
+    return latencies, errors, time.perf_counter() - started
+
+
+async def scenario_create(client, db, args) -> dict:
+    bodies = [
+        {**txn, "date": txn["date"].isoformat()}
+        for txn in generate_transactions(args.requests, seed=1)
+    ]
+    latencies, errors, elapsed = await run_requests(
+        args.requests,
+        args.concurrency,
+        lambda i: client.post("/api/transactions/", json=bodies[i])
+    )
+    return summarize("create", latencies, errors, elapsed)
+
+
+async def scenario_bulk_csv(client, db, args) -> dict:
+    rows = SCALES[args.scale]
+    latencies = []
+    errors = 0
+    with tempfile.TemporaryDirectory() as directory:
+        # A fresh file per run: re-uploading the same rows would only measure duplicate skipping
+        paths = [
+            write_csv(os.path.join(directory, f"transactions_{args.scale}_{run}.csv"), rows, seed=2 + run)
+            for run in range(args.bulk_repeat)
+        ]
+        started = time.perf_counter()
+        for path in paths:
+            run_started = time.perf_counter()
+            with open(path, "rb") as f:
+                response = await client.post("/api/transactions/bulk", files={"file": ("bulk.csv", f, "text/csv")})
+            if response.status_code == 202:
+                # Background import: wait for the job to finish
+                job_id = response.json()["job_id"]
+                while True:
+                    await asyncio.sleep(IMPORT_POLL_SECONDS)
+                    response = await client.get(f"/api/transactions/imports/{job_id}")
+                    if response.status_code >= 400 or response.json()["status"] in ("completed", "failed"):
+                        break
+                if response.status_code < 400 and response.json()["status"] == "failed":
+                    errors += 1
+                    continue
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - run_started)
+        elapsed = time.perf_counter() - started
+    # Throughput in rows per second
+    return summarize("bulk_csv", latencies, errors, elapsed, items=rows * len(latencies))
+
+
+async def scenario_listing(client, db, args) -> dict:
+    cursors = {}
+
+    async def send(index: int):
+        # Each worker slot walks the listing page by page, restarting at the end
+        slot = index % args.concurrency
+        params = {"limit": LISTING_PAGE_SIZE}
+        if cursors.get(slot):
+            params["cursor"] = cursors[slot]
+        response = await client.get("/api/transactions/", params=params)
+        if response.status_code == 200:
+            cursors[slot] = response.json()["next_cursor"]
+        return response
+
+    latencies, errors, elapsed = await run_requests(args.requests, args.concurrency, send)
+    return summarize("listing", latencies, errors, elapsed)
+
+
+async def scenario_insights(client, db, args, cached: bool) -> dict:
+    from app.services.versions import bump_data_version
+
+    async def prepare(index: int):
+        # A data change invalidates the cached insights (as a write would)
+        await bump_data_version(db, USER_ID)
+
+    # Warm the cache once so the cached scenario measures hits only
+    await client.get("/api/insights/", params={"allow_stale": "false"})
+    latencies, errors, elapsed = await run_requests(
+        args.insight_requests,
+        1 if not cached else args.concurrency,
+        lambda i: client.get("/api/insights/", params={"allow_stale": "false"}),
+        prepare=None if cached else prepare
+    )
+    return summarize("insights_cached" if cached else "insights_uncached", latencies, errors, elapsed)
+
+
+SCENARIO_FUNCTIONS = {
+    "create": scenario_create,
+    "bulk_csv": scenario_bulk_csv,
+    "listing": scenario_listing,
+    "insights_uncached": lambda client, db, args: scenario_insights(client, db, args, cached=False),
+    "insights_cached": lambda client, db, args: scenario_insights(client, db, args, cached=True),
+}
+
+
+async def run(args) -> list:
+    install_fake_llm(FakeGeminiModel(args.llm_latency, args.llm_jitter, args.llm_error_rate))
+    db = await install_database(args.mongodb_uri)
+
+    # Imported after the fakes are installed: the agents grab the LLM client at import time
+    import httpx
+    from app.main import app, lifespan
+    from app.services.summaries import rebuild_user_summary
+
+    quiet = open(os.devnull, "w") if not args.verbose else None
+    results = []
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=None) as client:
+            if SEEDED_SCENARIOS.intersection(args.scenarios):
+                print(f"Seeding {SCALES[args.scale]:,} transactions...")
+                await seed_transactions(db, SCALES[args.scale])
+                await rebuild_user_summary(db, USER_ID)
+
+            for name in args.scenarios:
+                print(f"Running {name}...")
+                with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+                    results.append(await SCENARIO_FUNCTIONS[name](client, db, args))
+    if quiet:
+        quiet.close()
+    return results
+
+
+def print_results(results: list):
+    print(f"\n{'scenario':<18} {'requests':>8} {'errors':>6} {'seconds':>8} {'throughput':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        print(
+            f"{r['scenario']:<18} {r['requests']:>8} {r['errors']:>6} {r['seconds']:>8.2f} "
+            f"{r['throughput']:>11.2f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f}"
+        )
+
+
+def compare(results: list, baseline_path: str, tolerance: float) -> list:
+    """Regressions against a saved run: p95 slower or throughput lower by more than tolerance"""
+    with open(baseline_path) as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+
+    regressions = []
+    for r in results:
+        before = baseline.get(r["scenario"])
+        if before is None:
+            continue
+        if before["p95_ms"] and r["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{r['scenario']}: p95 {before['p95_ms']:.2f}ms -> {r['p95_ms']:.2f}ms")
+        if before["throughput"] and r["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{r['scenario']}: throughput {before['throughput']:.2f} -> {r['throughput']:.2f}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="FinWise AI load benchmarks")
+    parser.add_argument("--scale", choices=list(SCALES), default="1k", help="rows seeded and uploaded")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenario names")
+    parser.add_argument("--requests", type=int, default=200, help="requests for create and listing")
+    parser.add_argument("--insight-requests", type=int, default=50)
+    parser.add_argument("--bulk-repeat", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="fake Gemini seconds per call")
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--mongodb-uri", default=None, help="real MongoDB to use instead of mongomock (database is dropped)")
+    parser.add_argument("--save", default=None, help="write results to this JSON file")
+    parser.add_argument("--compare", default=None, help="fail if results regress against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression ratio for --compare")
+    parser.add_argument("--verbose", action="store_true", help="show the app's log output")
+    args = parser.parse_args(argv)
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = asyncio.run(run(args))
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"scale": args.scale, "llm_latency": args.llm_latency, "results": results}, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare JSON serialization of transaction listings
+
+Old path: convert _id with str() in a loop, then FastAPI's jsonable_encoder
+and JSONResponse (stdlib json). New path: FastJSONResponse (orjson) on the
+records, ObjectId and datetime encoded directly.
+
+Run from the backend directory:
+    python -m benchmarks.serialization
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.responses import FastJSONResponse
+from app.services.queries import TransactionRecord
+
+SIZES = [100, 1000, 10000]
+REPEAT = 20
+
+
+def make_documents(count: int) -> list:
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "date": start + timedelta(hours=i),
+            "amount": round(random.uniform(50, 5000), 2),
+            "type": random.choice(["income", "expense"]),
+            "description": random.choice(["Swiggy food delivery", "Uber driving earnings", "Electricity bill"]),
+            "category": random.choice(["Food & Dining", "Freelance/Gig Income", "Bills & Utilities"]),
+            "confidence_score": 0.9,
+            "user_id": "default_user",
+            "created_at": start,
+        }
+        for i in range(count)
+    ]
+
+
+def old_path(documents: list) -> bytes:
+    transactions = [dict(doc) for doc in documents]
+    for txn in transactions:
+        txn["_id"] = str(txn["_id"])
+    content = jsonable_encoder({"transactions": transactions, "count": len(transactions)})
+    return JSONResponse(content).body
+
+
+def new_path(documents: list) -> bytes:
+    records = [TransactionRecord.from_doc(doc) for doc in documents]
+    return FastJSONResponse({"transactions": [r.to_dict() for r in records], "count": len(records)}).body
+
+
+def best_of(func, documents: list) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        func(documents)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    print(f"{'rows':>8} {'current (ms)':>14} {'orjson (ms)':>12} {'speedup':>8}")
+    for size in SIZES:
+        documents = make_documents(size)
+        old = best_of(old_path, documents)
+        new = best_of(new_path, documents)
+        print(f"{size:>8} {old * 1000:>14.2f} {new * 1000:>12.2f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+import app.services.category_cache as category_cache_module
+from app.database import db as database
+from app.services.category_cache import CategoryCache
+
+SWIGGY = {"category": "Food & Dining", "confidence_score": 0.95}
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    monkeypatch.setattr(database, "db", AsyncMongoMockClient()["test"])
+    monkeypatch.setattr(category_cache_module, "CATEGORY_CACHE_SYNC_SECONDS", 0)
+    return database.db
+
+
+def test_invalidation_reaches_other_workers(mongo):
+    async def scenario():
+        worker_a, worker_b = CategoryCache(), CategoryCache()
+        await worker_a.set("Swiggy order", "expense", SWIGGY)
+        assert (await worker_b.get("Swiggy order", "expense"))["category"] == "Food & Dining"
+
+        await worker_a.invalidate("Swiggy order 42", "expense")
+        return await worker_a.get("Swiggy order", "expense"), await worker_b.get("Swiggy order", "expense")
+
+    assert asyncio.run(scenario()) == (None, None)
+
+
+def test_set_after_invalidation_is_served_again(mongo):
+    async def scenario():
+        cache = CategoryCache()
+        await cache.set("Swiggy order", "expense", SWIGGY)
+        await cache.invalidate("Swiggy order", "expense")
+        await cache.set("Swiggy order", "expense", {"category": "Shopping", "confidence_score": 1.0})
+        cache.memory.delete("expense:swiggy order")
+        return await cache.get("Swiggy order", "expense")
+
+    assert asyncio.run(scenario())["category"] == "Shopping"
@@ -0,0 +1,64 @@
+import asyncio
+import io
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+from app.services.csv_import import CSVImport
+
+ROWS = [
+    ("2024-03-01", "Uber ride"),
+    ("2024-03-01", "Swiggy order"),
+    ("2024-03-01", "Uber ride"),
+    ("2024-03-02", "Metro card"),
+    ("2024-03-01", "Uber ride"),
+]
+
+
+class _Upload:
+    def __init__(self, rows: list):
+        lines = ["date,amount,type,description"] + [f"{date},120,expense,{description}" for date, description in rows]
+        self._data = io.BytesIO("\n".join(lines).encode())
+
+    async def read(self, size: int) -> bytes:
+        return self._data.read(size)
+
+
+class _DataAgent:
+    async def categorize_transactions(self, transactions: list, user_id: str = None) -> list:
+        return [{"category": "Transportation", "confidence_score": 0.9, "source": "local"} for _ in transactions]
+
+
+def _import(db, rows: list = ROWS, **kwargs) -> dict:
+    return asyncio.run(CSVImport(db, _DataAgent(), "u1", batch_size=2, **kwargs).run(_Upload(rows)))
+
+
+def test_repeats_across_batches_are_kept_and_reuploads_skipped():
+    db = AsyncMongoMockClient()["test"]
+
+    first = _import(db)
+    assert (first["transactions_added"], first["duplicate_count"]) == (5, 0)
+
+    again = _import(db)
+    assert (again["transactions_added"], again["duplicate_count"]) == (0, 5)
+    # Counts are kept only while an import runs
+    assert asyncio.run(db.import_occurrences.count_documents({})) == 0
+
+
+def test_batch_replayed_after_interruption_is_numbered_as_before():
+    db = AsyncMongoMockClient()["test"]
+    import_id = ObjectId()
+    saved = []
+
+    async def save_then_crash(progress: dict):
+        if saved:
+            raise RuntimeError("worker restarted")
+        saved.append(dict(progress))
+
+    # The second batch is committed but its progress is lost
+    try:
+        _import(db, on_progress=save_then_crash, import_id=import_id)
+    except RuntimeError:
+        pass
+
+    resumed = _import(db, resume_from=saved[0], import_id=import_id)
+    assert resumed["transactions_added"] + resumed["duplicate_count"] == 5
+    assert asyncio.run(db.transactions.count_documents({"description": "Uber ride"})) == 3
@@ -0,0 +1,44 @@
+import asyncio
+from bson import ObjectId
+from app.services.import_jobs import ImportJobQueue
+
+
+class _UnavailableJobs:
+    """import_jobs collection whose every call fails, as during a MongoDB outage"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def find_one_and_update(self, *args, **kwargs):
+        self.calls += 1
+        raise RuntimeError("connection refused")
+
+    def find(self, *args, **kwargs):
+        raise RuntimeError("connection refused")
+
+    async def update_many(self, *args, **kwargs):
+        raise RuntimeError("connection refused")
+
+
+class _Database:
+    def __init__(self):
+        self.import_jobs = _UnavailableJobs()
+
+
+def test_workers_survive_when_a_failed_job_cannot_be_recorded():
+    async def scenario():
+        db = _Database()
+        queue = ImportJobQueue(workers=2)
+        await queue.start(db, None)
+        try:
+            for _ in range(4):
+                await queue._enqueue(ObjectId())
+            await asyncio.wait_for(queue._queue.join(), timeout=1)
+            return db.import_jobs.calls, [worker.done() for worker in queue._workers]
+        finally:
+            await queue.stop()
+
+    # Each job is claimed once and then fails to record its failure
+    calls, finished = asyncio.run(scenario())
+    assert calls == 8
+    assert finished == [False, False]
@@ -0,0 +1,29 @@
+import asyncio
+from app.services.insight_cache import InsightCache
+
+
+def _compute(payloads: list):
+    async def compute():
+        return payloads.pop(0)
+    return compute
+
+
+def test_generated_payload_is_cached_for_its_version():
+    cache = InsightCache()
+    compute = _compute([{"insights": ["ai"], "fallback": False}])
+
+    assert asyncio.run(cache.get_or_compute(None, "k", "u1", 1, compute)) == ({"insights": ["ai"], "fallback": False}, True)
+    assert asyncio.run(cache.get_or_compute(None, "k", "u1", 1, compute))[0]["insights"] == ["ai"]
+
+
+def test_fallback_payload_is_not_cached():
+    cache = InsightCache()
+    compute = _compute([{"insights": ["rules"], "fallback": True}, {"insights": ["ai"], "fallback": False}])
+
+    payload, fresh = asyncio.run(cache.get_or_compute(None, "k", "u1", 1, compute))
+    assert payload["insights"] == ["rules"]
+    assert not fresh
+    assert asyncio.run(cache.get(None, "k", "u1")) is None
+
+    # The model is back: the next request generates instead of replaying the fallback
+    assert asyncio.run(cache.get_or_compute(None, "k", "u1", 1, compute)) == ({"insights": ["ai"], "fallback": False}, True)
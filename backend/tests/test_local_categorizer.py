@@ -0,0 +1,63 @@
+import time
+import pytest
+from app.agents.local_categorizer import KeywordMatcher, LocalCategorizer, NaiveBayesClassifier
+
+
+@pytest.mark.parametrize("description, transaction_type, category", [
+    ("Swiggy order", "expense", "Food & Dining"),
+    ("Big Bazaar groceries", "expense", "Food & Dining"),
+    ("Electricity bills for March", "expense", "Bills & Utilities"),
+    ("Uber rides", "expense", "Transportation"),
+    ("Metro buses pass", "expense", "Transportation"),
+    ("Freelancer payout", "income", "Freelance/Gig Income"),
+])
+def test_keyword_matches_whole_words_and_plurals(description, transaction_type, category):
+    assert KeywordMatcher().best_match(description, transaction_type) == category
+
+
+@pytest.mark.parametrize("description", [
+    "Business lunch",
+    "Watermelon",
+    "Billiards club",
+    "Parenting workshop",
+])
+def test_keyword_prefix_of_longer_word_does_not_match(description):
+    assert KeywordMatcher().match(description, "expense") == {}
+
+
+def test_unmatched_description_is_left_to_gemini():
+    assert LocalCategorizer().categorize("Billiards club", "expense", None) is None
+
+
+def _history():
+    examples = [(f"Swiggy food order {n}", "expense", "Food & Dining") for n in range(18)]
+    examples += [("Uber ride", "expense", "Transportation")] * 3
+    return examples
+
+
+def _categorizer_with(examples):
+    categorizer = LocalCategorizer()
+    categorizer._models["u1"] = (time.monotonic(), NaiveBayesClassifier().fit(examples))
+    return categorizer
+
+
+def test_classifier_predicts_from_seen_words():
+    category, probability = NaiveBayesClassifier().fit(_history()).predict("Uber ride home", "expense")
+    assert category == "Transportation"
+    assert probability > 0.9
+
+
+@pytest.mark.parametrize("description", [
+    "Random unknown merchant",
+    "LIC premium payment",
+    "Zepto instamart ride",
+])
+def test_classifier_abstains_on_unseen_words(description):
+    assert NaiveBayesClassifier().fit(_history()).predict(description, "expense") is None
+    assert _categorizer_with(_history()).categorize(description, "expense", "u1") is None
+
+
+def test_classifier_abstains_with_a_single_category():
+    examples = [(f"Swiggy food order {n}", "expense", "Food & Dining") for n in range(20)]
+    assert NaiveBayesClassifier().fit(examples).predict("Swiggy food order", "expense") is None
+    assert _categorizer_with(examples).categorize("Dinner out", "expense", "u1") is None
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.services.summaries import covers_window, _buckets
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+@pytest.mark.parametrize("start_date, end_date", [
+    (None, None),
+    (datetime(2024, 1, 2), None),
+    (datetime(2024, 1, 2), datetime(2024, 2, 1)),
+    (datetime(2024, 1, 2, tzinfo=timezone.utc), datetime(2024, 2, 1, tzinfo=timezone.utc)),
+    # Midnight UTC written in another timezone
+    (datetime(2024, 1, 2, 5, 30, tzinfo=IST), None),
+])
+def test_windows_bounded_at_utc_midnight_are_covered(start_date, end_date):
+    assert covers_window(start_date, end_date)
+
+
+@pytest.mark.parametrize("start_date, end_date", [
+    (datetime(2024, 1, 2, 12), None),
+    (None, datetime(2024, 2, 1, 0, 0, 1)),
+    # Local midnight is 18:30 UTC the day before
+    (datetime(2024, 1, 2, tzinfo=IST), None),
+    (None, datetime(2024, 2, 1, tzinfo=IST)),
+])
+def test_windows_cutting_through_a_utc_day_are_not_covered(start_date, end_date):
+    assert not covers_window(start_date, end_date)
+
+
+def test_aware_dates_land_in_their_utc_day_bucket():
+    assert _buckets(datetime(2024, 1, 2, 1, 0, tzinfo=IST))[0] == ("day", "2024-01-01")
+    assert _buckets(datetime(2024, 1, 2, 1, 0))[0] == ("day", "2024-01-02")
@@ -1,17 +1,34 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import Header from './components/Header';
 import Dashboard from './components/Dashboard';
 import TransactionForm from './components/TransactionForm';
 import TransactionList from './components/TransactionList';
 import InsightsBanner from './components/InsightsBanner';
 import GoalTracker from './components/GoalTracker';
-import { getTransactions, getInsights, getGoals } from './services/api';
+import { getTransactions, getInsights, getGoals, streamInsights } from './services/api';
 
 function App() {
   const [transactions, setTransactions] = useState([]);
   const [insights, setInsights] = useState(null);
   const [goals, setGoals] = useState([]);
   const [loading, setLoading] = useState(true);
+  const closeInsightStream = useRef(null);
+
+  const loadInsights = () => {
+    closeInsightStream.current?.();
+    // Items appear as they are generated; fall back to the plain request if streaming fails
+    closeInsightStream.current = streamInsights({
+      onUpdate: setInsights,
+      onError: async () => {
+        try {
+          const insightsData = await getInsights();
+          setInsights(insightsData);
+        } catch (error) {
+          console.error('Error fetching insights:', error);
+        }
+      },
+    });
+  };
 
   const fetchData = async () => {
     try {
@@ -26,12 +43,7 @@ function App() {
       
       // Fetch insights only if transactions exist
       if (txnData.transactions && txnData.transactions.length > 0) {
-        try {
-          const insightsData = await getInsights();
-          setInsights(insightsData);
-        } catch (error) {
-          console.error('Error fetching insights:', error);
-        }
+        loadInsights();
       }
     } catch (error) {
       console.error('Error fetching data:', error);
@@ -42,6 +54,7 @@ function App() {
 
   useEffect(() => {
     fetchData();
+    return () => closeInsightStream.current?.();
   }, []);
 
   const handleTransactionAdded = () => {
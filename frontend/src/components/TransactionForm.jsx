@@ -1,5 +1,5 @@
 import { useState } from 'react';
-import { createTransaction, uploadTransactionsCSV } from '../services/api';
+import { createTransaction, uploadTransactionsCSV, getImportJob } from '../services/api';
 
 export default function TransactionForm({ onTransactionAdded }) {
   const [formData, setFormData] = useState({
@@ -47,8 +47,22 @@ export default function TransactionForm({ onTransactionAdded }) {
     setMessage('');
 
     try {
-      const result = await uploadTransactionsCSV(file);
-      setMessage(`✅ Uploaded ${result.transactions_added} transactions!`);
+      let result = await uploadTransactionsCSV(file);
+
+      // Large files are imported in the background: poll until the job finishes
+      while (result.job_id && !['completed', 'failed'].includes(result.status)) {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        result = { job_id: result.job_id, ...(await getImportJob(result.job_id)) };
+        setMessage(`⏳ Importing... ${result.transactions_added} transactions added`);
+      }
+
+      if (result.status === 'failed') {
+        throw new Error(result.failure || 'Import failed');
+      }
+      const duplicates = result.duplicate_count
+        ? ` (${result.duplicate_count} already imported, skipped)`
+        : '';
+      setMessage(`✅ Uploaded ${result.transactions_added} transactions!${duplicates}`);
       onTransactionAdded();
     } catch (error) {
       setMessage('❌ Error uploading CSV: ' + error.message);
@@ -12,6 +12,28 @@ const api = axios.create({
   },
 });
 
+// Access token naming the signed-in user (issued by the backend's AUTH_SECRET). Without one,
+// a backend running without AUTH_SECRET serves its single default user.
+const AUTH_TOKEN_STORAGE_KEY = 'finwise_auth_token';
+
+export const getAuthToken = () => localStorage.getItem(AUTH_TOKEN_STORAGE_KEY);
+
+export const setAuthToken = (token) => {
+  if (token) {
+    localStorage.setItem(AUTH_TOKEN_STORAGE_KEY, token);
+  } else {
+    localStorage.removeItem(AUTH_TOKEN_STORAGE_KEY);
+  }
+};
+
+api.interceptors.request.use((config) => {
+  const token = getAuthToken();
+  if (token) {
+    config.headers.Authorization = `Bearer ${token}`;
+  }
+  return config;
+});
+
 // Transaction APIs
 export const createTransaction = async (transactionData) => {
   const response = await api.post('/transactions/', transactionData);
@@ -34,6 +56,11 @@ export const uploadTransactionsCSV = async (file) => {
   return response.data;
 };
 
+export const getImportJob = async (jobId) => {
+  const response = await api.get(`/transactions/imports/${jobId}`);
+  return response.data;
+};
+
 export const deleteTransaction = async (transactionId) => {
   const response = await api.delete(`/transactions/${transactionId}`);
   return response.data;
@@ -45,6 +72,43 @@ export const getInsights = async () => {
   return response.data;
 };
 
+// Streams insights as the AI produces them; returns a function that closes the stream
+export const streamInsights = ({ onUpdate, onDone, onError }) => {
+  // EventSource cannot send headers, so the token goes in the query string
+  const token = getAuthToken();
+  const query = token ? `?access_token=${encodeURIComponent(token)}` : '';
+  const source = new EventSource(`${API_BASE_URL}/insights/stream${query}`);
+  let result = { insights: [], recommendations: [] };
+  let finished = false;
+
+  source.addEventListener('analysis', (event) => {
+    result = { ...result, ...JSON.parse(event.data) };
+    onUpdate(result);
+  });
+  source.addEventListener('insight', (event) => {
+    result = { ...result, insights: [...result.insights, JSON.parse(event.data).text] };
+    onUpdate(result);
+  });
+  source.addEventListener('recommendation', (event) => {
+    result = { ...result, recommendations: [...result.recommendations, JSON.parse(event.data).text] };
+    onUpdate(result);
+  });
+  source.addEventListener('done', (event) => {
+    finished = true;
+    source.close();
+    onDone?.({ ...result, ...JSON.parse(event.data) });
+  });
+  source.onerror = (error) => {
+    // EventSource would reconnect and regenerate; give up instead
+    source.close();
+    if (!finished) {
+      onError?.(error);
+    }
+  };
+
+  return () => source.close();
+};
+
 // Goals APIs
 export const createGoal = async (goalData) => {
   const response = await api.post('/goals/', goalData);
@@ -12,7 +12,7 @@ BASE_URL = "http://localhost:8000"
 def test_health():
     """Test health endpoint"""
     print("Testing health endpoint...")
-    response = requests.get(f"{BASE_URL}/health")
+    response = requests.get(f"{BASE_URL}/api/health")
     if response.status_code == 200:
         print("✅ Health check passed")
         return True
@@ -23,7 +23,7 @@ def test_health():
 def test_root():
     """Test root endpoint"""
     print("\nTesting root endpoint...")
-    response = requests.get(f"{BASE_URL}/")
+    response = requests.get(f"{BASE_URL}/api")
     if response.status_code == 200:
         data = response.json()
         print(f"✅ Root endpoint passed: {data['message']}")